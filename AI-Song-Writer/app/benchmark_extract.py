@@ -0,0 +1,93 @@
+"""
+Compare the music21 and mido note extraction backends on the bundled archive.
+
+Parity: per file, whether both backends emit the same tokens, and the token
+similarity of the two sequences. The mido backend does not repeat notes held
+across a barline and orders overlapping voices by onset, so a few files differ
+slightly. Also checks that every mido token is a valid note or chord token.
+Throughput: files and notes per second of each backend, serial and uncached.
+
+Usage: python benchmark_extract.py [--data midi_files/archives] [--min-similarity 0.9]
+"""
+import argparse
+import difflib
+import os
+import re
+import time
+
+from midi_ingest import EXTRACTORS, PITCH_NAMES
+
+
+NOTE_TOKEN = re.compile(r"(%s)-?\d+" % "|".join(re.escape(name) for name in PITCH_NAMES))
+CHORD_TOKEN = re.compile(r"(1[01]|\d)(\.(1[01]|\d))*")
+
+
+def valid_token(token):
+    return bool(NOTE_TOKEN.fullmatch(token) or CHORD_TOKEN.fullmatch(token))
+
+
+def run(backend, midi_paths):
+    extract = EXTRACTORS[backend]
+    results = {}
+    start = time.perf_counter()
+    for midi_path in midi_paths:
+        try:
+            results[midi_path] = extract(midi_path)
+        except Exception as e:
+            print(f"{backend}: error processing {midi_path}: {e}")
+            results[midi_path] = []
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=os.path.join('midi_files', 'archives'), help='Directory of .mid files')
+    parser.add_argument('--min-similarity', type=float, default=0.9, help='Fail below this mean token similarity')
+    parser.add_argument('--verbose', action='store_true', help='List every file that differs')
+    args = parser.parse_args()
+
+    midi_paths = [
+        os.path.join(args.data, file)
+        for file in sorted(os.listdir(args.data))
+        if file.endswith(".mid")
+    ]
+    print(f"{len(midi_paths)} MIDI files")
+
+    reference, reference_time = run('music21', midi_paths)
+    fast, fast_time = run('mido', midi_paths)
+
+    for backend, results, elapsed in (('music21', reference, reference_time), ('mido', fast, fast_time)):
+        notes = sum(len(notes) for notes in results.values())
+        print(f"{backend:8} {elapsed:8.2f} s  {len(midi_paths) / elapsed:8.1f} files/s  {notes / elapsed:10.0f} notes/s")
+    print(f"Speedup: {reference_time / fast_time:.1f}x")
+
+    exact = 0
+    similarities = []
+    for midi_path in midi_paths:
+        expected, actual = reference[midi_path], fast[midi_path]
+        if expected == actual:
+            exact += 1
+            similarities.append(1.0)
+            continue
+        similarity = difflib.SequenceMatcher(None, expected, actual, autojunk=False).ratio()
+        similarities.append(similarity)
+        if args.verbose:
+            print(f"  {os.path.basename(midi_path)}: {len(expected)} vs {len(actual)} notes, similarity {similarity:.3f}")
+
+    invalid = sorted({token for notes in fast.values() for token in notes if not valid_token(token)})
+    reference_vocab = {token for notes in reference.values() for token in notes}
+    fast_vocab = {token for notes in fast.values() for token in notes}
+    mean_similarity = sum(similarities) / len(similarities)
+
+    print(f"Identical files: {exact}/{len(midi_paths)}")
+    print(f"Mean token similarity: {mean_similarity:.3f}")
+    print(f"Vocabulary: {len(reference_vocab)} music21, {len(fast_vocab)} mido, {len(reference_vocab & fast_vocab)} shared")
+
+    if invalid:
+        raise SystemExit(f"Invalid tokens from the mido backend: {invalid[:10]}")
+    if mean_similarity < args.min_similarity:
+        raise SystemExit(f"Mean token similarity {mean_similarity:.3f} is below {args.min_similarity}")
+
+
+if __name__ == '__main__':
+    main()
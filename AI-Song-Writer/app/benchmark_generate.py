@@ -0,0 +1,86 @@
+"""
+Benchmark note generation on a model trained briefly on the bundled archive.
+
+Times the former model.predict loop, the windowed mode of generate_notes and
+its stateful mode, all from the same seed and RNG state. Checks that the
+windowed mode reproduces the predict loop, and that the single-step model
+fed a whole window from zero states predicts what the full model predicts.
+
+Usage: python benchmark_generate.py [--data midi_files/archives] [--notes 100] [--epochs 1]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from music_generator import MusicGenerator
+
+
+def predict_loop(generator, start_sequence, num_notes):
+    """The former generate_notes: model.predict on the whole window for every note."""
+    pattern = [generator.notes_to_int[char] for char in start_sequence]
+    output = []
+    for _ in range(num_notes):
+        prediction_input = np.reshape(pattern, (1, len(pattern), 1)) / float(len(generator.notes_to_int))
+        prediction = generator.model.predict(prediction_input, verbose=0)
+        next_index = generator._sample_note(prediction, 1.0)
+        output.append(generator.int_to_notes[next_index])
+        pattern = pattern[1:] + [next_index]
+    return output
+
+
+def timed(label, fn, seed):
+    np.random.seed(seed)
+    start = time.perf_counter()
+    notes = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:10} {elapsed:8.2f} s  {len(notes) / elapsed:8.1f} notes/s")
+    return notes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=os.path.join('midi_files', 'archives'), help='Directory of .mid files')
+    parser.add_argument('--notes', type=int, default=100, help='Notes to generate per run')
+    parser.add_argument('--epochs', type=int, default=1, help='Training epochs before generating')
+    parser.add_argument('--seed', type=int, default=0, help='NumPy RNG seed of every run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="notes_cache_") as cache_dir:
+        generator = MusicGenerator(cache_dir=cache_dir, note_backend='mido')
+        generator.process_midi_files(args.data)
+    generator.create_model()
+    generator.train(epochs=args.epochs, batch_size=128)
+
+    length = generator.sequence_length
+    start_sequence = [generator.int_to_notes[index] for index in generator.note_stream[:length]]
+
+    reference, reference_time = timed("predict", lambda: predict_loop(generator, start_sequence, args.notes), args.seed)
+    windowed, windowed_time = timed("windowed", lambda: generator.generate_notes(start_sequence, args.notes), args.seed)
+    stateful, stateful_time = timed("stateful", lambda: generator.generate_notes(start_sequence, args.notes, stateful=True), args.seed)
+
+    print(f"Speedup: {reference_time / windowed_time:.1f}x windowed, {reference_time / stateful_time:.1f}x stateful")
+    agreeing = sum(a == b for a, b in zip(reference, stateful))
+    print(f"Stateful notes equal to the windowed ones: {agreeing}/{len(reference)}")
+
+    # The single-step model must compute the same function as the full model over one window
+    _, step_fn, initial_states = generator._inference_functions()
+    window = (generator.note_stream[length:2 * length] / float(len(generator.notes_to_int))).astype(np.float32)
+    states = initial_states()
+    for value in window:
+        step_prediction, states = step_fn(tf.constant([[value]]), states)
+    full_prediction = generator.model(window.reshape(1, length, 1), training=False).numpy()
+    difference = np.abs(step_prediction.numpy() - full_prediction).max()
+    print(f"Single-step vs full model max difference: {difference:.2e}")
+
+    if windowed != reference:
+        raise SystemExit("Windowed generation differs from the predict loop")
+    if stateful[0] != reference[0] or difference > 1e-4:
+        raise SystemExit("Stateful generation does not match the full model")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark MIDI ingestion on the bundled archive.
+
+Times midi_ingest.load_notes parsing serially without a cache (the former
+behaviour), parsing in a process pool into an empty cache, and a re-run
+served from the cache. One file is parsed before timing so music21's
+import and first-use cost isn't charged to whichever run comes first, and
+the serial and pooled runs alternate over several rounds; the best time of
+each is reported. Also checks that all runs extract the same notes.
+
+Usage: python benchmark_ingest.py [--data midi_files/archives] [--workers N] [--rounds 3]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from midi_ingest import NotesCache, load_notes
+
+
+def timed(midi_paths, cache, workers):
+    start = time.perf_counter()
+    results = load_notes(midi_paths, cache, workers)
+    return results, time.perf_counter() - start
+
+
+def report(label, results, elapsed):
+    notes = sum(len(notes) for _, notes, _ in results)
+    failed = sum(1 for _, _, error in results if error)
+    print(f"{label:24} {elapsed:8.2f} s  ({notes} notes, {failed} failed files)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=os.path.join('midi_files', 'archives'), help='Directory of .mid files')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Pool processes, default one per core and at least two')
+    parser.add_argument('--rounds', type=int, default=3, help='Alternating serial and pooled runs')
+    args = parser.parse_args()
+
+    midi_paths = [
+        os.path.join(args.data, file)
+        for file in sorted(os.listdir(args.data))
+        if file.endswith(".mid")
+    ]
+    workers = args.workers or max(2, os.cpu_count() or 1)
+    print(f"{len(midi_paths)} MIDI files, {os.cpu_count()} cores, {workers} pool processes")
+
+    # Warm-up: imports and first-use initialisation of the parser
+    load_notes(midi_paths[:1], None, 1)
+
+    serial_times, pooled_times = [], []
+    outputs = []
+    cache_dir = tempfile.mkdtemp(prefix="notes_cache_")
+    try:
+        for round_index in range(args.rounds):
+            # Alternate which run goes first, so neither gets a warmer machine
+            runs = [('serial', 1), ('pooled', workers)]
+            if round_index % 2:
+                runs.reverse()
+            for name, run_workers in runs:
+                round_cache = None
+                if name == 'pooled':
+                    shutil.rmtree(cache_dir)
+                    round_cache = NotesCache(cache_dir)
+                results, elapsed = timed(midi_paths, round_cache, run_workers)
+                (serial_times if name == 'serial' else pooled_times).append(elapsed)
+                outputs.append(results)
+
+        cached, cached_time = timed(midi_paths, NotesCache(cache_dir), workers)
+        outputs.append(cached)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    report("serial, no cache", outputs[0], min(serial_times))
+    report("pooled, cold cache", outputs[1], min(pooled_times))
+    report("re-run, warm cache", cached, cached_time)
+
+    if any(output != outputs[0] for output in outputs):
+        raise SystemExit("Extracted notes differ between runs")
+
+    print(f"Speedup: {min(serial_times) / min(pooled_times):.2f}x pooled, "
+          f"{min(serial_times) / cached_time:.1f}x cached")
+
+
+if __name__ == '__main__':
+    main()
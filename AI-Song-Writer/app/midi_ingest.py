@@ -0,0 +1,241 @@
+import hashlib
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import mido
+from music21 import converter, instrument, note, chord
+
+# Bump when the extracted note format changes, older cache entries are ignored
+CACHE_FORMAT = 2
+
+# Fewer files than this are parsed in-process, a pool costs more to start than it saves
+MIN_POOL_FILES = 16
+
+# Pitch spelling used by music21 for MIDI note numbers
+PITCH_NAMES = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B']
+
+
+def extract_notes(midi_path):
+    """Extract notes and chords from a MIDI file with music21."""
+    notes = []
+    midi = converter.parse(midi_path)
+
+    try:
+        s2 = instrument.partitionByInstrument(midi)
+        if s2 and s2.parts:  # Check if there are any instruments
+            notes_to_parse = s2.parts[0].recurse()
+        else:
+            notes_to_parse = midi.flat.notes
+    except:
+        notes_to_parse = midi.flat.notes
+
+    for element in notes_to_parse:
+        if isinstance(element, note.Note):
+            notes.append(str(element.pitch))
+        elif isinstance(element, chord.Chord):
+            notes.append('.'.join(str(n) for n in element.normalOrder))
+
+    return notes
+
+
+def normal_order(pitch_classes):
+    """Normal order of a pitch-class set, as music21's Chord.normalOrder."""
+    pcs = sorted(set(pitch_classes))
+    rotations = [pcs[i:] + [pc + 12 for pc in pcs[:i]] for i in range(len(pcs))]
+    # Smallest span first, then the most compact packing towards the first pitch
+    best = min(rotations, key=lambda r: (r[-1] - r[0],) + tuple(pc - r[0] for pc in r[1:]))
+    return [pc % 12 for pc in best]
+
+
+def _track_notes(track):
+    """(onset, offset, pitch) of every note in a track, in onset order, in ticks."""
+    events = []
+    tick = 0
+    for msg in track:
+        tick += msg.time
+        events.append((tick, msg))
+
+    # Pair each note_on with the next note_off of the same key, as music21 does
+    notes = []
+    pending_offs = {}
+    for tick, msg in reversed(events):
+        if msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
+            pending_offs[msg.note, msg.channel] = tick
+        elif msg.type == 'note_on':
+            off = pending_offs.get((msg.note, msg.channel))
+            if off is not None:
+                notes.append((tick, off, msg.note))
+    notes.reverse()
+    return notes
+
+
+def extract_notes_mido(midi_path):
+    """
+    Extract notes and chords from the raw MIDI events, without building a music21 stream.
+    Emits the same tokens as extract_notes: notes starting and ending together (within a
+    sixteenth) form a chord. Unlike music21, notes held across a barline are not repeated.
+    """
+    midi = mido.MidiFile(midi_path)
+    tolerance = midi.ticks_per_beat / 4
+
+    # First track with notes, like the first part of partitionByInstrument
+    notes = []
+    for track in midi.tracks:
+        notes = _track_notes(track)
+        if notes:
+            break
+
+    tokens = []
+    grouped = [False] * len(notes)
+    for i, (onset, offset, pitch) in enumerate(notes):
+        if grouped[i]:
+            continue
+        group = [pitch]
+        for j in range(i + 1, len(notes)):
+            other_onset, other_offset, other_pitch = notes[j]
+            if other_onset - onset >= tolerance:
+                break
+            if abs(other_offset - offset) <= tolerance:
+                group.append(other_pitch)
+                grouped[j] = True
+
+        if len(group) > 1:
+            tokens.append('.'.join(str(pc) for pc in normal_order(p % 12 for p in group)))
+        else:
+            tokens.append(f"{PITCH_NAMES[pitch % 12]}{pitch // 12 - 1}")
+
+    return tokens
+
+
+EXTRACTORS = {
+    'music21': extract_notes,
+    'mido': extract_notes_mido,
+}
+
+
+def _parse_file(midi_path, backend='music21'):
+    """Pool worker: parse one file, returning its notes and the error if it failed."""
+    try:
+        return EXTRACTORS[backend](midi_path), None
+    except Exception as e:
+        return [], str(e)
+
+
+def file_digest(path):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class NotesCache:
+    """On-disk cache of the notes parsed from each MIDI file, failures included."""
+
+    def __init__(self, cache_dir=".notes_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, midi_path, backend):
+        # Each backend has its own entries, their notes may differ slightly
+        key = hashlib.sha1(f"{os.path.abspath(midi_path)}:{backend}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, midi_path, backend='music21'):
+        """Return the cached entry of an unchanged file, or None."""
+        entry_path = self._entry_path(midi_path, backend)
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        if (entry.get('format') != CACHE_FORMAT or entry.get('path') != os.path.abspath(midi_path)
+                or entry.get('backend') != backend):
+            return None
+
+        stat = os.stat(midi_path)
+        if entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry
+
+        # Touched but not modified files keep their entry
+        if entry['sha256'] == file_digest(midi_path):
+            entry['mtime'], entry['size'] = stat.st_mtime_ns, stat.st_size
+            self._write(entry_path, entry)
+            return entry
+        return None
+
+    def put(self, midi_path, notes, error=None, backend='music21'):
+        """Store the parse result of a file."""
+        stat = os.stat(midi_path)
+        entry = {
+            'format': CACHE_FORMAT,
+            'backend': backend,
+            'path': os.path.abspath(midi_path),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': file_digest(midi_path),
+            'notes': notes,
+            'error': error,
+        }
+        self._write(self._entry_path(midi_path, backend), entry)
+        return entry
+
+    def _write(self, entry_path, entry):
+        # Write atomically so an interrupted run never leaves a corrupt entry
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+
+def load_notes(midi_paths, cache=None, workers=1, backend='music21'):
+    """
+    Parse MIDI files, reusing cached results of unchanged files. Files are
+    parsed in-process by default. With workers > 1 (None for one per core) and
+    at least MIN_POOL_FILES files to parse they are parsed in a spawn process
+    pool; spawned children re-import the caller's main module, so scripts
+    using the pool must guard their entry point with
+    ``if __name__ == '__main__':``. backend is a key of EXTRACTORS. Returns a
+    list of (path, notes, error) in the order of midi_paths.
+    """
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Unknown note extraction backend {backend!r}, expected one of {sorted(EXTRACTORS)}")
+
+    entries = {}
+    to_parse = []
+    for midi_path in midi_paths:
+        entry = cache.get(midi_path, backend) if cache is not None else None
+        if entry is not None:
+            entries[midi_path] = (entry['notes'], entry['error'])
+        else:
+            to_parse.append(midi_path)
+
+    if to_parse:
+        workers = min(workers or os.cpu_count() or 1, len(to_parse))
+        parallel = workers > 1 and len(to_parse) >= MIN_POOL_FILES
+        # Spawned workers don't inherit the parent's state, like the chatbot's pool
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn')
+        ) if parallel else None
+        try:
+            # Small chunks keep the pool busy when file sizes vary a lot
+            backends = [backend] * len(to_parse)
+            if parallel:
+                results = pool.map(_parse_file, to_parse, backends, chunksize=1)
+            else:
+                results = map(_parse_file, to_parse, backends)
+            for midi_path, (notes, error) in zip(to_parse, results):
+                entries[midi_path] = (notes, error)
+                if cache is not None:
+                    cache.put(midi_path, notes, error, backend)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    print(f"Parsed {len(to_parse)} MIDI files, {len(midi_paths) - len(to_parse)} loaded from cache")
+    return [(midi_path, *entries[midi_path]) for midi_path in midi_paths]
@@ -7,93 +7,113 @@ import pickle
 import matplotlib.pyplot as plt
 from IPython.display import Audio, display
 import pretty_midi
+from midi_ingest import EXTRACTORS, NotesCache, load_notes
+from note_windows import encode_notes, note_windows
 
 
 class MusicGenerator:
-    def __init__(self, sequence_length=50):
-        """Initialize the MusicGenerator with a sequence length."""
+    def __init__(self, sequence_length=50, cache_dir=".notes_cache", note_backend="music21", streaming=False):
+        """
+        Initialize the MusicGenerator with a sequence length, a parsed-notes cache directory and a note extraction backend ('music21' or the faster 'mido').
+        Training windows are cut per batch from the int32 note stream; with streaming=True the targets also stay note indices and the model uses sparse categorical cross-entropy.
+        """
+        if note_backend not in EXTRACTORS:
+            raise ValueError(f"Unknown note backend {note_backend!r}, expected one of {sorted(EXTRACTORS)}")
         self.sequence_length = sequence_length
+        self.cache_dir = cache_dir
+        self.note_backend = note_backend
+        self.streaming = streaming
+        self.note_stream = np.zeros(0, dtype=np.int32)
         self.notes_to_int = {}
         self.int_to_notes = {}
         self.sequences = []
         self.next_notes = []
         self.model = None
         self.training_history = None
+        self._inference = None
 
-    def process_midi_files(self, data_path):
-        """Process MIDI files from a directory or a single file."""
+    def process_midi_files(self, data_path, workers=1, use_cache=True):
+        """
+        Process MIDI files from a directory or a single file. workers > 1 parses
+        them in a process pool, see midi_ingest.load_notes.
+        """
         notes = []
 
         # Handle both directory and single file paths
         if os.path.isdir(data_path):
-            for file in os.listdir(data_path):
-                if file.endswith(".mid"):
-                    midi_path = os.path.join(data_path, file)
-                    extracted_notes = self._extract_notes(midi_path)
-                    if not extracted_notes:
-                        print(f"No notes found in {midi_path}. Skipping file.")
-                        continue
-                    notes.extend(extracted_notes)
+            midi_paths = [
+                os.path.join(data_path, file)
+                for file in sorted(os.listdir(data_path))
+                if file.endswith(".mid")
+            ]
         elif os.path.isfile(data_path) and data_path.endswith(".mid"):
-            extracted_notes = self._extract_notes(data_path)
-            if not extracted_notes:
-                print(f"No notes found in {data_path}.")
-                return
-            notes.extend(extracted_notes)
+            midi_paths = [data_path]
         else:
             raise ValueError(f"Invalid path: {data_path}. Provide a valid MIDI file or directory.")
 
+        cache = NotesCache(self.cache_dir) if use_cache else None
+        for midi_path, extracted_notes, error in load_notes(midi_paths, cache, workers, self.note_backend):
+            if error:
+                print(f"Error processing {midi_path}: {error}")
+                continue
+            if not extracted_notes:
+                print(f"No notes found in {midi_path}. Skipping file.")
+                continue
+            notes.extend(extracted_notes)
+
+        if not notes and len(midi_paths) == 1:
+            return
+
         print(f"Total notes extracted: {len(notes)}")
 
         if len(notes) <= self.sequence_length:
             raise ValueError("The number of notes is too small for the given sequence length.")
 
-        # Create vocabulary
-        unique_notes = sorted(set(notes))
+        # Create vocabulary and encode the corpus once, windows are views of this stream
+        unique_notes, self.note_stream = encode_notes(notes)
         print(f"Unique notes found: {len(unique_notes)}")
         self.notes_to_int = {note: number for number, note in enumerate(unique_notes)}
         self.int_to_notes = {number: note for number, note in enumerate(unique_notes)}
 
-        # Create sequences
-        network_input = []
-        network_output = []
-
-        for i in range(0, len(notes) - self.sequence_length):
-            sequence_in = notes[i:i + self.sequence_length]
-            sequence_out = notes[i + self.sequence_length]
-            network_input.append([self.notes_to_int[char] for char in sequence_in])
-            network_output.append(self.notes_to_int[sequence_out])
-
-        if not network_output:
-            raise ValueError("No sequences generated. Check the input data and sequence length.")
-
-        self.sequences = np.reshape(network_input, (len(network_input), self.sequence_length, 1))
-        self.sequences = self.sequences / float(len(self.notes_to_int))
-        self.next_notes = tf.keras.utils.to_categorical(network_output, num_classes=len(self.notes_to_int))
+        # Normalized inputs and one-hot targets are only computed for the rows read
+        self.sequences, self.next_notes = note_windows(self.note_stream, self.sequence_length, len(unique_notes))
 
         print(f"Generated {len(self.sequences)} input sequences and {len(self.next_notes)} output sequences.")
 
+    def make_dataset(self, start=0, stop=None, batch_size=64, shuffle=True):
+        """
+        Build a tf.data pipeline of (normalized window, next note) batches for the windows starting in [start, stop).
+        Targets are note indices in streaming mode and one-hot vectors otherwise.
+        """
+        num_windows = len(self.note_stream) - self.sequence_length
+        stop = num_windows if stop is None else min(stop, num_windows)
+        if stop <= start:
+            raise ValueError("No training sequences available. Process MIDI files first.")
+
+        stream = tf.constant(self.note_stream)
+        offsets = tf.range(self.sequence_length, dtype=tf.int64)
+        vocab_size = len(self.notes_to_int)
+
+        def cut_windows(starts):
+            # One gather per batch, the windows never exist outside it
+            windows = tf.gather(stream, starts[:, None] + offsets)
+            inputs = tf.cast(windows, tf.float32)[..., None] / float(vocab_size)
+            targets = tf.gather(stream, starts + self.sequence_length)
+            if not self.streaming:
+                targets = tf.one_hot(targets, vocab_size)
+            return inputs, targets
+
+        dataset = tf.data.Dataset.range(start, stop)
+        if shuffle:
+            dataset = dataset.shuffle(stop - start, reshuffle_each_iteration=True)
+        return (dataset.batch(batch_size)
+                .map(cut_windows, num_parallel_calls=tf.data.AUTOTUNE)
+                .prefetch(tf.data.AUTOTUNE))
+
     def _extract_notes(self, midi_path):
         """Extract notes and chords from a MIDI file."""
         try:
-            notes = []
-            midi = converter.parse(midi_path)
-
-            try:
-                s2 = instrument.partitionByInstrument(midi)
-                if s2 and s2.parts:  # Check if there are any instruments
-                    notes_to_parse = s2.parts[0].recurse()
-                else:
-                    notes_to_parse = midi.flat.notes
-            except:
-                notes_to_parse = midi.flat.notes
-
-            for element in notes_to_parse:
-                if isinstance(element, note.Note):
-                    notes.append(str(element.pitch))
-                elif isinstance(element, chord.Chord):
-                    notes.append('.'.join(str(n) for n in element.normalOrder))
-
+            notes = EXTRACTORS[self.note_backend](midi_path)
             print(f"Extracted {len(notes)} notes from {midi_path}")
             return notes
 
@@ -114,7 +134,9 @@ class MusicGenerator:
             outputs = tf.keras.layers.Dense(len(self.notes_to_int), activation='softmax')(x)
 
             self.model = tf.keras.Model(inputs, outputs)
-            self.model.compile(loss='categorical_crossentropy', optimizer='rmsprop')
+            # Streaming batches carry note indices instead of one-hot targets
+            loss = 'sparse_categorical_crossentropy' if self.streaming else 'categorical_crossentropy'
+            self.model.compile(loss=loss, optimizer='rmsprop')
             print("Model created successfully")
             
         except Exception as e:
@@ -127,15 +149,17 @@ class MusicGenerator:
             if self.model is None:
                 self.create_model()
 
-            if len(self.sequences) == 0:
+            num_windows = len(self.note_stream) - self.sequence_length
+            if num_windows <= 0:
                 raise ValueError("No training sequences available. Process MIDI files first.")
 
+            # Same split as validation_split=0.2: the last 20% of the windows
+            split = int(num_windows * 0.8)
             self.training_history = self.model.fit(
-                self.sequences, 
-                self.next_notes, 
-                epochs=epochs, 
-                batch_size=batch_size,
-                validation_split=0.2
+                self.make_dataset(0, split, batch_size),
+                validation_data=self.make_dataset(split, num_windows, batch_size, shuffle=False),
+                epochs=epochs,
+                shuffle=False  # make_dataset already reshuffles every epoch
             )
             
             print("Training completed successfully")
@@ -145,32 +169,46 @@ class MusicGenerator:
             print(f"Error during training: {str(e)}")
             raise
 
-    def generate_notes(self, start_sequence, num_notes=500, temperature=1.0):
-        """Generate new music notes."""
+    def generate_notes(self, start_sequence, num_notes=500, temperature=1.0, stateful=False):
+        """
+        Generate new music notes.
+        By default every note is predicted from the last sequence_length notes, like the training windows.
+        With stateful=True the LSTM states are carried forward so each note costs a single timestep: the first note
+        matches the windowed mode exactly, later ones are conditioned on the whole generated history instead of a window.
+        """
         try:
             if len(start_sequence) != self.sequence_length:
                 raise ValueError(f"Start sequence must be {self.sequence_length} notes long")
 
             pattern = [self.notes_to_int[char] for char in start_sequence]
             prediction_output = []
+            window_fn, step_fn, initial_states = self._inference_functions()
+            vocab_size = float(len(self.notes_to_int))
 
-            for _ in range(num_notes):
-                prediction_input = np.reshape(pattern, (1, len(pattern), 1))
-                prediction_input = prediction_input / float(len(self.notes_to_int))
-
-                prediction = self.model.predict(prediction_input, verbose=0)
+            if stateful and step_fn is None:
+                raise ValueError("Stateful generation needs a model made of LSTM, Dropout and Dense layers only")
+            if stateful:
+                # Prime the states with the start sequence, the last step predicts the first note
+                states = initial_states()
+                for index in pattern:
+                    prediction, states = step_fn(tf.constant([[index / vocab_size]], tf.float32), states)
 
-                # Apply temperature sampling
-                prediction = np.log(prediction) / temperature
-                exp_preds = np.exp(prediction)
-                prediction = exp_preds / np.sum(exp_preds)
+            for _ in range(num_notes):
+                if not stateful:
+                    prediction_input = np.reshape(pattern, (1, len(pattern), 1))
+                    prediction_input = tf.constant(prediction_input / vocab_size, tf.float32)
+                    # Direct calls avoid the per-call setup of model.predict
+                    prediction = window_fn(prediction_input)
 
-                next_index = np.random.choice(len(prediction[0]), p=prediction[0])
+                next_index = self._sample_note(prediction.numpy(), temperature)
                 next_note = self.int_to_notes[next_index]
 
                 prediction_output.append(next_note)
-                pattern.append(next_index)
-                pattern = pattern[1:]
+                if stateful:
+                    prediction, states = step_fn(tf.constant([[next_index / vocab_size]], tf.float32), states)
+                else:
+                    pattern.append(next_index)
+                    pattern = pattern[1:]
 
             print(f"Generated {len(prediction_output)} notes")
             return prediction_output
@@ -179,6 +217,50 @@ class MusicGenerator:
             print(f"Error generating notes: {str(e)}")
             raise
 
+    def _sample_note(self, prediction, temperature):
+        """Sample a note index from the predicted distribution with temperature."""
+        prediction = np.log(prediction) / temperature
+        exp_preds = np.exp(prediction)
+        prediction = exp_preds / np.sum(exp_preds)
+        return np.random.choice(len(prediction[0]), p=prediction[0])
+
+    def _inference_functions(self):
+        """
+        Compiled windowed and single-step calls of the current model, rebuilt when the model changes.
+        The single-step call runs the trained LSTM cells one timestep at a time on explicit states.
+        """
+        if self.model is None:
+            raise ValueError("No model available. Create, train or load a model first.")
+        if self._inference is not None and self._inference[0] is self.model:
+            return self._inference[1:]
+
+        model = self.model
+        layers = [layer for layer in model.layers if not isinstance(layer, (tf.keras.layers.InputLayer, tf.keras.layers.Dropout))]
+        supported = all(isinstance(layer, (tf.keras.layers.LSTM, tf.keras.layers.Dense)) for layer in layers)
+        lstm_layers = [layer for layer in layers if isinstance(layer, tf.keras.layers.LSTM)]
+
+        @tf.function
+        def window_fn(inputs):
+            return model(inputs, training=False)
+
+        @tf.function
+        def step_fn(inputs, states):
+            x = inputs
+            new_states = []
+            for layer in layers:
+                if isinstance(layer, tf.keras.layers.LSTM):
+                    x, layer_states = layer.cell(x, states[len(new_states)], training=False)
+                    new_states.append(layer_states)
+                else:
+                    x = layer(x, training=False)
+            return x, new_states
+
+        def initial_states():
+            return [[tf.zeros((1, layer.units)), tf.zeros((1, layer.units))] for layer in lstm_layers]
+
+        self._inference = (model, window_fn, step_fn if supported else None, initial_states)
+        return self._inference[1:]
+
     def create_midi(self, prediction_output, filename="generated_music.mid"):
         """Convert the predicted notes into a MIDI file."""
         try:
@@ -0,0 +1,64 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def encode_notes(notes):
+    """Encode note tokens as an int32 stream, returning the sorted vocabulary and the stream."""
+    vocabulary = sorted(set(notes))
+    index = {note: number for number, note in enumerate(vocabulary)}
+    # One lookup per note, faster than np.unique on string arrays
+    stream = np.fromiter((index[note] for note in notes), dtype=np.int32, count=len(notes))
+    return vocabulary, stream
+
+
+class LazyArray:
+    """Read-only array-like over a view, transforming only the elements that are indexed."""
+
+    def __init__(self, base, transform, shape, dtype):
+        self.base = base
+        self.transform = transform
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        return self.transform(self.base[key])
+
+    def __array__(self, dtype=None, copy=None):
+        # Materializes the whole array, for callers that need a real ndarray
+        array = self.transform(self.base)
+        return array if dtype is None else array.astype(dtype)
+
+    def __repr__(self):
+        return f"LazyArray(shape={self.shape}, dtype={self.dtype})"
+
+
+def note_windows(stream, sequence_length, vocab_size):
+    """
+    Sliding windows over a note stream without copying it.
+    Returns (sequences, next_notes): normalized (N, sequence_length, 1) inputs and
+    one-hot (N, vocab_size) targets, both computed only for the rows that are read.
+    """
+    num_windows = len(stream) - sequence_length
+    windows = sliding_window_view(stream[:-1], sequence_length)[..., np.newaxis]
+    targets = stream[sequence_length:]
+
+    sequences = LazyArray(
+        windows,
+        lambda w: w / float(vocab_size),
+        (num_windows, sequence_length, 1),
+        np.float64
+    )
+    next_notes = LazyArray(
+        targets,
+        lambda t: (np.asarray(t)[..., np.newaxis] == np.arange(vocab_size)).astype(np.float32),
+        (num_windows, vocab_size),
+        np.float32
+    )
+    return sequences, next_notes
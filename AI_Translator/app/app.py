@@ -1,10 +1,53 @@
+import os
+import threading
+import time
+
 from flask import Flask, render_template, request, flash
 import requests
+from requests.adapters import HTTPAdapter
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
 
-API_URL = "http://127.0.0.1:8000"
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+
+# (connect, read) timeouts of backend calls in seconds
+API_TIMEOUT = (3.05, float(os.getenv("API_READ_TIMEOUT", 30)))
+
+# Seconds the supported languages list is reused before asking the backend again
+LANGUAGES_TTL = float(os.getenv("LANGUAGES_TTL", 3600))
+
+# One pooled keep-alive session for all backend calls
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+_languages_cache = {"languages": None, "expires_at": 0.0}
+_languages_lock = threading.Lock()
+
+
+def get_languages():
+    """
+    Get the supported languages, from the local cache while it is fresh.
+    A stale list is kept when the backend can't be reached.
+    """
+    with _languages_lock:
+        if _languages_cache["languages"] is not None and time.monotonic() < _languages_cache["expires_at"]:
+            return _languages_cache["languages"]
+
+    try:
+        response = session.get(f"{API_URL}/languages", timeout=API_TIMEOUT)
+        response.raise_for_status()
+        languages = response.json()
+    except requests.exceptions.RequestException:
+        if _languages_cache["languages"] is None:
+            raise
+        return _languages_cache["languages"]
+
+    with _languages_lock:
+        _languages_cache["languages"] = languages
+        _languages_cache["expires_at"] = time.monotonic() + LANGUAGES_TTL
+    return languages
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -15,11 +58,9 @@ def index():
     source_lang = None
     target_lang = None
 
-    # Fetch supported languages
+    # Fetch supported languages, skipped while the local cache is warm
     try:
-        response = requests.get(f"{API_URL}/languages")
-        response.raise_for_status()
-        languages = response.json()
+        languages = get_languages()
     except requests.exceptions.RequestException:
         flash("Could not fetch supported languages. Please try again later.")
 
@@ -38,7 +79,7 @@ def index():
                 "target_lang": target_lang,
             }
             try:
-                response = requests.post(f"{API_URL}/translate", json=payload)
+                response = session.post(f"{API_URL}/translate", json=payload, timeout=API_TIMEOUT)
                 response.raise_for_status()
                 result = response.json()
                 original_text = result["original_text"]
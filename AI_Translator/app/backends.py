@@ -0,0 +1,358 @@
+# translation_service/backends.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+from deep_translator import GoogleTranslator
+
+from batching import PackSplitError, translate_pack
+from detection import detect_locally
+
+
+class TranslationBackend:
+    """
+    Base class of translation backends. Methods are blocking and run in the
+    translator pool.
+    """
+
+    name = "base"
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        return True
+
+    def load(self) -> None:
+        """
+        Load models or clients ahead of the first request.
+        """
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        raise NotImplementedError
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        return [self.translate(text, source_lang, target_lang) for text in texts]
+
+    def detect(self, text: str) -> str:
+        raise NotImplementedError
+
+
+class GoogleBackend(TranslationBackend):
+    """
+    Google Translate through deep_translator, the network fallback.
+    """
+
+    name = "google"
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        # Packed segments share one request, see batching.pack_segments
+        translator = GoogleTranslator(source=source_lang, target=target_lang)
+        return translate_pack(translator.translate, texts)
+
+    def detect(self, text: str) -> str:
+        return GoogleTranslator().detect(text)
+
+
+class StubBackend(TranslationBackend):
+    """
+    Deterministic offline backend for tests and local development.
+    """
+
+    name = "stub"
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return f"[{source_lang}->{target_lang}] {text}"
+
+    def detect(self, text: str) -> str:
+        return detect_locally(text)[0] or "en"
+
+
+class DynamicBatcher:
+    """
+    Collects texts queued by concurrent callers and runs them through the
+    model together, up to max_batch texts or max_wait seconds after the first.
+    """
+
+    def __init__(self, run_batch: Callable[[List[str]], List[str]], max_batch: int = 16, max_wait: float = 0.01):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Callers that timed out cancelled their futures, skip those texts
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                results = self.run_batch(texts)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Model returned {len(results)} translations for {len(batch)} texts")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class MarianBackend(TranslationBackend):
+    """
+    Local MarianMT models run on the CPU with transformers. The model of each
+    language pair is loaded once per worker by load, or on first use, and
+    batches concurrent requests dynamically. Callers wait at most timeout
+    seconds for a translation. transformers and torch are optional dependencies.
+    """
+
+    name = "marian"
+
+    def __init__(
+        self,
+        pairs: List[Tuple[str, str]],
+        model_template: str = "Helsinki-NLP/opus-mt-{source}-{target}",
+        max_batch: int = 16,
+        max_wait: float = 0.01,
+        timeout: float = 10.0
+    ):
+        self.pairs = set(pairs)
+        self.model_template = model_template
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._batchers: Dict[Tuple[str, str], DynamicBatcher] = {}
+        self._lock = threading.Lock()
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        return (source_lang, target_lang) in self.pairs
+
+    def _load(self, source_lang: str, target_lang: str) -> DynamicBatcher:
+        import torch
+        from transformers import MarianMTModel, MarianTokenizer
+
+        model_name = self.model_template.format(source=source_lang, target=target_lang)
+        tokenizer = MarianTokenizer.from_pretrained(model_name)
+        model = MarianMTModel.from_pretrained(model_name)
+        model.eval()
+
+        def run_batch(texts: List[str]) -> List[str]:
+            inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+            with torch.no_grad():
+                outputs = model.generate(**inputs)
+            return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+        return DynamicBatcher(run_batch, self.max_batch, self.max_wait)
+
+    def _batcher(self, source_lang: str, target_lang: str) -> DynamicBatcher:
+        pair = (source_lang, target_lang)
+        batcher = self._batchers.get(pair)
+        if batcher is None:
+            with self._lock:
+                batcher = self._batchers.get(pair)
+                if batcher is None:
+                    batcher = self._batchers[pair] = self._load(source_lang, target_lang)
+        return batcher
+
+    def load(self) -> None:
+        for source_lang, target_lang in sorted(self.pairs):
+            self._batcher(source_lang, target_lang)
+
+    def _wait(self, futures: List[Future]) -> List[str]:
+        deadline = time.monotonic() + self.timeout
+        try:
+            return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+        except TimeoutError:
+            # Drop texts still queued, the model has no caller for them
+            for future in futures:
+                future.cancel()
+            raise
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return self._wait([self._batcher(source_lang, target_lang).submit(text)])[0]
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        batcher = self._batcher(source_lang, target_lang)
+        return self._wait([batcher.submit(text) for text in texts])
+
+
+class BackendRegistry:
+    """
+    Registered backends and the choice of backend per language pair. Backends
+    are tried in order: the route of the pair, the default order, then the
+    fallback, skipping backends that don't support the pair or failed.
+    """
+
+    def __init__(self, default_order: List[str], fallback: Optional[str] = None):
+        self.backends: Dict[str, TranslationBackend] = {}
+        self.routes: Dict[Tuple[str, str], str] = {}
+        self.default_order = default_order
+        self.fallback = fallback
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def register(self, backend: TranslationBackend) -> None:
+        self.backends[backend.name] = backend
+        self.calls.setdefault(backend.name, 0)
+        self.errors.setdefault(backend.name, 0)
+
+    def route(self, source_lang: str, target_lang: str, name: str) -> None:
+        self.routes[(source_lang, target_lang)] = name
+
+    def load(self) -> None:
+        """
+        Load every backend that can be selected, so the first requests don't
+        wait for model loading. Blocking, meant for startup.
+        """
+        names = set(self.default_order) | set(self.routes.values()) | {self.fallback}
+        for name in sorted(filter(None, names)):
+            backend = self.backends.get(name)
+            if backend is not None:
+                backend.load()
+
+    def select(self, source_lang: str, target_lang: str) -> List[TranslationBackend]:
+        """
+        Backends to try for a language pair, in order.
+        """
+        names = [self.routes.get((source_lang, target_lang))] + self.default_order + [self.fallback]
+        selected = []
+        for name in names:
+            backend = self.backends.get(name) if name else None
+            if backend is not None and backend not in selected and backend.supports(source_lang, target_lang):
+                selected.append(backend)
+        if not selected:
+            raise ValueError(f"No translation backend for {source_lang} -> {target_lang}")
+        return selected
+
+    def _call(self, method: str, source_lang: str, target_lang: str, *args):
+        error: Optional[Exception] = None
+        for attempt, backend in enumerate(self.select(source_lang, target_lang)):
+            if attempt:
+                self.fallbacks += 1
+            self.calls[backend.name] += 1
+            try:
+                return getattr(backend, method)(*args, source_lang, target_lang)
+            except PackSplitError:
+                # The backend works, the caller retries the segments one by one
+                raise
+            except Exception as e:
+                self.errors[backend.name] += 1
+                error = e
+        raise error
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return self._call("translate", source_lang, target_lang, text)
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        return self._call("translate_batch", source_lang, target_lang, texts)
+
+    def detect(self, text: str) -> str:
+        """
+        Detect the language with the first backend able to.
+        """
+        names = self.default_order + [self.fallback]
+        for name in names:
+            backend = self.backends.get(name) if name else None
+            if backend is not None and type(backend).detect is not TranslationBackend.detect:
+                return backend.detect(text)
+        raise ValueError("No backend can detect languages")
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Backend metrics for the /stats endpoint.
+        """
+        return {
+            "default_order": self.default_order,
+            "fallback": self.fallback,
+            "calls": dict(self.calls),
+            "errors": dict(self.errors),
+            "fallbacks": self.fallbacks
+        }
+
+
+# Separates the languages of a pair, codes like zh-CN contain hyphens
+PAIR_SEPARATOR = ">"
+
+
+def parse_pairs(value: str) -> List[Tuple[str, str]]:
+    """
+    Parse comma separated language pairs, e.g. "en>fr,zh-CN>en". A hyphen
+    also separates the pair when it is the only one, as in "en-fr".
+
+    :raises ValueError: for a pair that can't be split unambiguously
+    """
+    pairs = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if PAIR_SEPARATOR in item:
+            source_lang, target_lang = item.split(PAIR_SEPARATOR, 1)
+        elif item.count("-") == 1:
+            source_lang, target_lang = item.split("-")
+        else:
+            raise ValueError(f"Ambiguous language pair {item!r}, write it as source{PAIR_SEPARATOR}target")
+        pairs.append((source_lang.strip(), target_lang.strip()))
+    return pairs
+
+
+def create_registry_from_env() -> BackendRegistry:
+    """
+    Build the backend registry from environment variables:
+
+    TRANSLATION_BACKENDS  backends in order of preference, e.g. "marian,google" (default "google")
+    TRANSLATION_FALLBACK  backend tried last, default "google" ("" to disable)
+    TRANSLATION_ROUTES    backend per pair, e.g. "en-fr:marian,zh-CN>en:marian"
+    MARIAN_PAIRS          pairs with a local MarianMT model, e.g. "en-fr,pt-BR>en"
+
+    Pairs are written source>target, or source-target when neither code has a hyphen.
+    """
+    default_order = [name.strip() for name in os.getenv("TRANSLATION_BACKENDS", "google").split(",") if name.strip()]
+    fallback = os.getenv("TRANSLATION_FALLBACK", "google") or None
+
+    registry = BackendRegistry(default_order, fallback)
+    registry.register(GoogleBackend())
+    registry.register(StubBackend())
+    registry.register(MarianBackend(
+        parse_pairs(os.getenv("MARIAN_PAIRS", "")),
+        model_template=os.getenv("MARIAN_MODEL_TEMPLATE", "Helsinki-NLP/opus-mt-{source}-{target}"),
+        max_batch=int(os.getenv("MARIAN_MAX_BATCH", 16)),
+        max_wait=float(os.getenv("MARIAN_MAX_WAIT", 0.01)),
+        timeout=float(os.getenv("MARIAN_TIMEOUT", 10))
+    ))
+
+    for item in os.getenv("TRANSLATION_ROUTES", "").split(","):
+        if ":" in item:
+            pair, name = item.strip().split(":", 1)
+            for source_lang, target_lang in parse_pairs(pair):
+                registry.route(source_lang, target_lang, name)
+
+    return registry
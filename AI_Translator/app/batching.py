@@ -0,0 +1,203 @@
+# translation_service/batching.py
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Joins packed segments into one upstream request, segments must not contain it
+PACK_SEPARATOR = "\n"
+
+_PARAGRAPH_BREAK = re.compile(r"(\n\s*\n\s*)")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?。！？])(\s+)")
+_WHITESPACE = re.compile(r"(\s+)")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work: the first caller of a key runs it,
+    later callers await the same in-flight result.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks = set()
+        self.leaders = 0
+        self.shared = 0
+
+    def join(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        Get the in-flight future of a key, if any.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+        return future
+
+    def lead(self, key: Hashable) -> asyncio.Future:
+        """
+        Register the caller as the one running the work of a key.
+        """
+        future = asyncio.get_running_loop().create_future()
+        # Followers may be gone, don't warn about an unretrieved exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self.leaders += 1
+        return future
+
+    def resolve(self, key: Hashable, result: Any) -> None:
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def fail(self, key: Hashable, error: BaseException) -> None:
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run function once for all concurrent callers of the same key. The work
+        runs in its own task, so a cancelled caller doesn't cancel it for others.
+        """
+        future = self.join(key)
+        if future is None:
+            future = self.lead(key)
+            task = asyncio.ensure_future(function())
+            self._tasks.add(task)
+            task.add_done_callback(lambda done: self._settle(key, done))
+        return await asyncio.shield(future)
+
+    def _settle(self, key: Hashable, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.fail(key, RuntimeError("Coalesced call was cancelled"))
+        elif task.exception() is not None:
+            self.fail(key, task.exception())
+        else:
+            self.resolve(key, task.result())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "shared": self.shared
+        }
+
+
+def pack_segments(segments: List[str], max_chars: int) -> List[List[str]]:
+    """
+    Pack segments into as few groups as possible whose joined length stays
+    within max_chars. Segments that cannot be joined safely (too long, or
+    containing the separator) get a group of their own.
+    """
+    packs = []
+    current: List[str] = []
+    length = 0
+
+    for segment in segments:
+        if len(segment) > max_chars or PACK_SEPARATOR in segment:
+            packs.append([segment])
+            continue
+
+        added = len(segment) + (len(PACK_SEPARATOR) if current else 0)
+        if current and length + added > max_chars:
+            packs.append(current)
+            current, length = [], 0
+            added = len(segment)
+
+        current.append(segment)
+        length += added
+
+    if current:
+        packs.append(current)
+    return packs
+
+
+class PackSplitError(Exception):
+    """
+    Raised when a packed translation does not split back into its segments.
+    Callers translate the segments of the pack one by one instead.
+    """
+
+
+def keep_whitespace(segment: str, translated: str) -> str:
+    """
+    Give a translation the leading and trailing whitespace of its segment.
+    """
+    core = segment.strip()
+    if not core:
+        return segment
+    start = segment.index(core)
+    return segment[:start] + translated.strip() + segment[start + len(core):]
+
+
+def translate_pack(translate: Callable[[str], str], segments: List[str]) -> List[str]:
+    """
+    Translate a pack of segments with one upstream call. Each translation
+    keeps the leading and trailing whitespace of its segment.
+
+    :param translate: Blocking function translating one text
+    :param segments: Segments of one pack
+    :return: Translations in the order of the segments
+    :raises PackSplitError: if the translation does not split back cleanly
+    """
+    if len(segments) == 1:
+        translated = translate(segments[0])
+        return [translated if translated is None else keep_whitespace(segments[0], translated)]
+
+    translated = translate(PACK_SEPARATOR.join(segments)) or ""
+    parts = translated.split(PACK_SEPARATOR)
+    if len(parts) != len(segments):
+        raise PackSplitError(f"Translation of {len(segments)} packed segments split into {len(parts)}")
+    return [keep_whitespace(segment, part) for segment, part in zip(segments, parts)]
+
+
+def _split_on(pattern: "re.Pattern", text: str) -> List[Tuple[str, str]]:
+    """
+    Split text into (piece, separator) pairs on a pattern with one capture group.
+    """
+    parts = pattern.split(text)
+    parts.append("")
+    return [(parts[i], parts[i + 1]) for i in range(0, len(parts) - 1, 2)]
+
+
+def split_text(text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """
+    Split text into chunks of at most max_chars on paragraph boundaries,
+    then sentence boundaries, then whitespace, merging small neighbours.
+    Joining every chunk with its separator gives back the original text.
+
+    :return: List of (chunk, separator following it) pairs
+    """
+    pieces = []
+    for paragraph, paragraph_separator in _split_on(_PARAGRAPH_BREAK, text):
+        if len(paragraph) <= max_chars:
+            pieces.append((paragraph, paragraph_separator))
+            continue
+
+        sentences = _split_on(_SENTENCE_BREAK, paragraph)
+        for index, (sentence, separator) in enumerate(sentences):
+            if index == len(sentences) - 1:
+                separator += paragraph_separator
+            if len(sentence) <= max_chars:
+                pieces.append((sentence, separator))
+                continue
+
+            # Sentences beyond the limit are cut between words, or hard cut
+            words = _split_on(_WHITESPACE, sentence)
+            for word_index, (word, word_separator) in enumerate(words):
+                if word_index == len(words) - 1:
+                    word_separator += separator
+                for start in range(0, max(len(word), 1), max_chars):
+                    end = start + max_chars
+                    pieces.append((word[start:end], word_separator if end >= len(word) else ""))
+
+    # Merge neighbouring pieces into chunks up to the size limit
+    chunks: List[Tuple[str, str]] = []
+    for piece, separator in pieces:
+        if chunks:
+            chunk, previous_separator = chunks[-1]
+            if len(chunk) + len(previous_separator) + len(piece) <= max_chars:
+                chunks[-1] = (chunk + previous_separator + piece, separator)
+                continue
+        chunks.append((piece, separator))
+    return chunks
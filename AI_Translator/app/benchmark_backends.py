@@ -0,0 +1,89 @@
+"""
+Check backend configuration parsing and time the dynamic batcher.
+
+Language pairs and routes are parsed from sample TRANSLATION_ROUTES and
+MARIAN_PAIRS values, including codes with a region tag such as zh-CN, and
+the registry must pick the configured backend for them. Then concurrent
+callers send texts through a DynamicBatcher over a model stand-in with a
+fixed cost per batch. Exits non-zero on a wrong pair, route or translation.
+
+Usage: python benchmark_backends.py [--texts 2000] [--callers 32]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import DynamicBatcher, create_registry_from_env, parse_pairs
+
+# (setting, expected pairs)
+PAIR_SAMPLES = [
+    ("en-fr,en-de", [("en", "fr"), ("en", "de")]),
+    ("zh-CN>en, pt-BR>en", [("zh-CN", "en"), ("pt-BR", "en")]),
+    ("en>zh-TW", [("en", "zh-TW")]),
+    ("", []),
+]
+
+# Settings the parser must refuse rather than guess
+AMBIGUOUS_SAMPLES = ["zh-CN-en", "pt-BR-en"]
+
+
+def check_config():
+    errors = []
+    for value, expected in PAIR_SAMPLES:
+        pairs = parse_pairs(value)
+        if pairs != expected:
+            errors.append(f"parse_pairs({value!r}) gave {pairs}, expected {expected}")
+
+    for value in AMBIGUOUS_SAMPLES:
+        try:
+            parse_pairs(value)
+            errors.append(f"parse_pairs({value!r}) accepted an ambiguous pair")
+        except ValueError:
+            pass
+
+    os.environ["TRANSLATION_BACKENDS"] = "google"
+    os.environ["TRANSLATION_ROUTES"] = "zh-CN>en:stub,en-fr:stub"
+    registry = create_registry_from_env()
+    for source_lang, target_lang, expected in [("zh-CN", "en", "stub"), ("en", "fr", "stub"), ("zh", "en", "google")]:
+        selected = registry.select(source_lang, target_lang)[0].name
+        if selected != expected:
+            errors.append(f"{source_lang} -> {target_lang} routed to {selected}, expected {expected}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--texts', type=int, default=2000, help='Texts translated')
+    parser.add_argument('--callers', type=int, default=32, help='Concurrent callers')
+    parser.add_argument('--batch-cost', type=float, default=0.005, help='Seconds per model call')
+    args = parser.parse_args()
+
+    errors = check_config()
+
+    def run_batch(texts):
+        time.sleep(args.batch_cost)
+        return [text.upper() for text in texts]
+
+    batcher = DynamicBatcher(run_batch, max_batch=16, max_wait=0.01)
+    texts = [f"text {i}" for i in range(args.texts)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.callers) as callers:
+        results = list(callers.map(lambda text: batcher.submit(text).result(timeout=10), texts))
+    elapsed = time.perf_counter() - start
+
+    if results != [text.upper() for text in texts]:
+        errors.append("Batched translations don't match their texts")
+
+    print(f"{args.texts} texts in {elapsed:.2f} s, {batcher.batches} batches "
+          f"({batcher.texts / max(1, batcher.batches):.1f} texts per batch)")
+    print(f"Unbatched model calls would take {args.texts * args.batch_cost:.2f} s")
+
+    for error in errors:
+        print(f"  {error}")
+    if errors:
+        raise SystemExit(f"{len(errors)} failed checks")
+
+
+if __name__ == '__main__':
+    main()
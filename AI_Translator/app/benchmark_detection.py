@@ -0,0 +1,76 @@
+"""
+Check and time the offline language detector on labelled samples.
+
+Every sample the heuristic detector answers with enough confidence to skip
+the upstream detect call must carry the right language, since the text is
+then translated from it. Exits non-zero on any such wrong detection and
+reports the share of samples answered locally and the time per detection.
+
+Usage: python benchmark_detection.py [--repeat 2000] [--min-confidence 0.6]
+"""
+import argparse
+import time
+
+from detection import detect_locally
+
+# (text, expected language), the ambiguous ones should be left to upstream
+SAMPLES = [
+    ("The weather is nice today and I want to go for a walk with you.", "en"),
+    ("¿Dónde está la estación de tren? Muchas gracias por su ayuda.", "es"),
+    ("Bonjour, je voudrais réserver une table pour deux personnes ce soir.", "fr"),
+    ("Guten Morgen, ich möchte für heute Abend einen Tisch für zwei reservieren.", "de"),
+    ("Ciao, come stai? Questo è il mio amico della scuola.", "it"),
+    ("Olá, você sabe onde está a estação? Muito obrigado.", "pt"),
+    ("Привет, как дела? Я хочу заказать столик на вечер.", "ru"),
+    ("Привіт, як справи? Їжак зїв ґудзик.", "uk"),
+    ("Здраво, ђак је у школи и пије воду.", "sr"),
+    ("こんにちは、今日はいい天気ですね。", "ja"),
+    # Mostly kanji with a few kana, Japanese rather than Chinese
+    ("東京都新宿区西新宿二丁目の高層ビル群は日本有数の業務地区である。", "ja"),
+    ("日本国憲法第九条は戦争放棄を定める", "ja"),
+    ("株式会社トヨタ自動車本社工場", "ja"),
+    ("今天天气很好，我们一起去公园散步吧。", "zh-CN"),
+    ("中华人民共和国成立于一九四九年", "zh-CN"),
+    ("안녕하세요, 오늘 날씨가 좋네요.", "ko"),
+    ("مرحبا، كيف حالك اليوم؟", "ar"),
+    ("שלום, מה שלומך היום?", "iw"),
+    ("Καλημέρα, τι κάνεις σήμερα;", "el"),
+    ("नमस्ते, आज मौसम बहुत अच्छा है।", "hi"),
+    ("สวัสดีครับ วันนี้อากาศดีมาก", "th"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000, help='Passes over the samples for the timing')
+    parser.add_argument('--min-confidence', type=float, default=0.6, help='Confidence that skips the upstream call')
+    args = parser.parse_args()
+
+    answered = 0
+    wrong = []
+    for text, expected in SAMPLES:
+        lang, confidence = detect_locally(text)
+        if lang is None or confidence < args.min_confidence:
+            print(f"  upstream  {expected:6} {text[:40]}")
+            continue
+        answered += 1
+        if lang != expected:
+            wrong.append((text, expected, lang, confidence))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text, _ in SAMPLES:
+            detect_locally(text)
+    elapsed = time.perf_counter() - start
+
+    print(f"Answered locally: {answered}/{len(SAMPLES)}")
+    print(f"Detection time: {elapsed / (args.repeat * len(SAMPLES)) * 1e6:.1f} us")
+
+    for text, expected, lang, confidence in wrong:
+        print(f"  wrong     {text[:40]!r}: expected {expected}, got {lang} ({confidence:.2f})")
+    if wrong:
+        raise SystemExit(f"{len(wrong)} confident wrong detections")
+
+
+if __name__ == '__main__':
+    main()
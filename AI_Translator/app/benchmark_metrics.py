@@ -0,0 +1,69 @@
+"""
+Measure the overhead of the latency instrumentation.
+
+Times a histogram observation on its own, and a plain ASGI endpoint called
+with and without MetricsMiddleware in front of it, so the difference is
+the per-request cost of the middleware.
+
+Usage: python benchmark_metrics.py [--requests 200000]
+"""
+import argparse
+import asyncio
+import time
+
+from metrics import MetricsMiddleware, MetricsRegistry
+
+
+async def endpoint(scope, receive, send):
+    """Smallest possible ASGI endpoint"""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call_app(app, requests):
+    scope = {"type": "http", "method": "GET", "path": "/health"}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200000, help='Calls per measurement')
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("benchmark_seconds", "Benchmark", ("method", "route", "status"))
+
+    start = time.perf_counter()
+    for i in range(args.requests):
+        histogram.observe(i * 1e-7, "GET", "/health", "200")
+    observe_cost = (time.perf_counter() - start) / args.requests
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        with histogram.time("GET", "/health", "200"):
+            pass
+    timer_cost = (time.perf_counter() - start) / args.requests
+
+    plain = asyncio.run(call_app(endpoint, args.requests))
+    instrumented = asyncio.run(call_app(MetricsMiddleware(endpoint, histogram), args.requests))
+
+    print(f"Histogram.observe:    {observe_cost * 1e6:6.2f} us")
+    print(f"Histogram.time block: {timer_cost * 1e6:6.2f} us")
+    print(f"Endpoint:             {plain * 1e6:6.2f} us/request")
+    print(f"Endpoint + middleware:{instrumented * 1e6:6.2f} us/request "
+          f"(+{(instrumented - plain) * 1e6:.2f} us)")
+    print(f"/metrics render:      {len(registry.render())} bytes")
+
+
+if __name__ == '__main__':
+    main()
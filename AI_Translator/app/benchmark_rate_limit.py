@@ -0,0 +1,100 @@
+"""
+Microbenchmark of the rate limiter with many distinct client IPs.
+
+Compares the sliding-window counter limiter of rate_limit.py with the
+previous implementation, which rebuilt a dict of per-IP timestamp lists on
+every request, and reports time per request and memory held by the state.
+
+Usage: python benchmark_rate_limit.py [--clients 10000] [--requests 100000]
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from rate_limit import SlidingWindowLimiter
+
+WINDOW = 60
+LIMIT = 100
+
+
+class DictRebuildLimiter:
+    """The former rate_limit dependency, kept here for comparison"""
+
+    def __init__(self):
+        self.request_timestamps = {}
+
+    def hit(self, client_ip, current_time):
+        self.request_timestamps = {
+            ip: timestamps
+            for ip, timestamps in self.request_timestamps.items()
+            if current_time - timestamps[-1] < WINDOW
+        }
+
+        if client_ip in self.request_timestamps:
+            if len(self.request_timestamps[client_ip]) >= LIMIT:
+                return False
+            self.request_timestamps[client_ip].append(current_time)
+        else:
+            self.request_timestamps[client_ip] = [current_time]
+        return True
+
+
+def make_traffic(clients, requests, duration):
+    """Random client IPs with increasing timestamps spread over duration seconds"""
+    rng = random.Random(0)
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+    step = duration / requests
+    return [(rng.choice(ips), i * step) for i in range(requests)]
+
+
+def run_sliding_window(traffic):
+    limiter = SlidingWindowLimiter(LIMIT, WINDOW)
+
+    async def drive():
+        for client_ip, now in traffic:
+            await limiter.hit(client_ip, now)
+
+    asyncio.run(drive())
+    return limiter
+
+
+def run_dict_rebuild(traffic):
+    limiter = DictRebuildLimiter()
+    for client_ip, now in traffic:
+        limiter.hit(client_ip, now)
+    return limiter
+
+
+def measure(name, function, traffic):
+    tracemalloc.start()
+    start = time.perf_counter()
+    state = function(traffic)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+
+    print(f"{name:16} {elapsed / len(traffic) * 1e6:10.2f} us/request "
+          f"{memory / 1024 / 1024:8.1f} MiB state")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=10000, help='Distinct client IPs')
+    parser.add_argument('--requests', type=int, default=100000, help='Requests to simulate')
+    parser.add_argument('--duration', type=float, default=300, help='Simulated seconds of traffic')
+    parser.add_argument('--skip-baseline', action='store_true', help='Skip the slow dict rebuild limiter')
+    args = parser.parse_args()
+
+    traffic = make_traffic(args.clients, args.requests, args.duration)
+    print(f"{args.requests} requests from {args.clients} clients over {args.duration:.0f} s")
+
+    measure("sliding window", run_sliding_window, traffic)
+    if not args.skip_baseline:
+        measure("dict rebuild", run_dict_rebuild, traffic)
+
+
+if __name__ == '__main__':
+    main()
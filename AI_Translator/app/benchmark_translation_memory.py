@@ -0,0 +1,104 @@
+"""
+Measure the memory and lookup time of the translation memory.
+
+Fills a TranslationMemory with synthetic sentences and reports the bytes
+per stored segment, traced on a smaller fill since tracing slows additions
+down a lot. Then times lookups of near-duplicates of stored
+sentences (one word changed) and of unrelated sentences. Exits non-zero
+when too few near-duplicates are found or an unrelated sentence matches.
+Multiply bytes per segment by TM_MAX_SEGMENTS to size a worker's memory.
+
+Usage: python benchmark_translation_memory.py [--segments 100000] [--lookups 2000]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from translation_memory import TranslationMemory
+
+WORDS = (
+    "the a service order account payment delivery customer report invoice team "
+    "meeting update schedule request support product price contract project data "
+    "please confirm review send check approve cancel change receive deliver today "
+    "tomorrow next week before after within until for with from about our your"
+).split()
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def near_duplicate(rng, text):
+    """The text with one word replaced, about 0.9 similar for long sentences."""
+    words = text.rstrip(".").split()
+    words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words) + "."
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--segments', type=int, default=100000, help='Segments stored')
+    parser.add_argument('--traced-segments', type=int, default=10000, help='Segments of the traced fill')
+    parser.add_argument('--lookups', type=int, default=2000, help='Lookups of each kind')
+    parser.add_argument('--words', type=int, default=16, help='Words per sentence')
+    parser.add_argument('--threshold', type=float, default=0.8, help='Similarity of a match')
+    parser.add_argument('--min-hit-rate', type=float, default=0.5, help='Near-duplicates that must match')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [sentence(rng, args.words) for _ in range(args.segments)]
+    translations = [f"[fr] {text}" for text in texts]
+    segments = [(text, "en", "fr", translation) for text, translation in zip(texts, translations)]
+
+    # The texts exist before tracing starts, their size is added separately
+    traced = segments[:args.traced_segments]
+    text_bytes = sum(sys.getsizeof(text) + sys.getsizeof(translation) for text, _, _, translation in traced)
+    tracemalloc.start()
+    traced_memory = TranslationMemory(threshold=args.threshold, max_segments=len(traced))
+    traced_memory.add_many(traced)
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced_memory
+    index_per_segment = index_bytes / max(1, len(traced))
+    text_per_segment = text_bytes / max(1, len(traced))
+    per_segment = index_per_segment + text_per_segment
+    print(f"{per_segment:.0f} bytes per segment of {len(texts[0])} chars: {index_per_segment:.0f} index, "
+          f"{text_per_segment:.0f} source and target text")
+    print(f"About {per_segment * args.segments / 1024 ** 2:.0f} MiB for {args.segments} segments, "
+          f"{per_segment * 1e6 / 1024 ** 3:.1f} GiB for 1M, per worker")
+
+    memory = TranslationMemory(threshold=args.threshold, max_segments=args.segments)
+    start = time.perf_counter()
+    memory.add_many(segments)
+    add_time = time.perf_counter() - start
+    print(f"{memory.stats()['segments']} segments stored in {add_time:.1f} s, "
+          f"{add_time / args.segments * 1e6:.0f} us each")
+
+    errors = []
+    queries = [near_duplicate(rng, rng.choice(texts)) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    hits = sum(1 for query in queries if memory.lookup(query, "en", "fr") is not None)
+    near_time = time.perf_counter() - start
+    print(f"Near-duplicate lookups: {near_time / args.lookups * 1000:.2f} ms each, "
+          f"{hits / args.lookups:.0%} matched")
+    if hits < args.min_hit_rate * args.lookups:
+        errors.append(f"Only {hits} of {args.lookups} near-duplicates matched")
+
+    unrelated = [sentence(rng, args.words) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    false_hits = sum(1 for query in unrelated if memory.lookup(query, "en", "fr") is not None)
+    miss_time = time.perf_counter() - start
+    print(f"Unrelated lookups: {miss_time / args.lookups * 1000:.2f} ms each, {false_hits} matched")
+    if false_hits:
+        errors.append(f"{false_hits} unrelated sentences matched a stored segment")
+
+    for error in errors:
+        print(f"  {error}")
+    if errors:
+        raise SystemExit(f"{len(errors)} failed checks")
+
+
+if __name__ == '__main__':
+    main()
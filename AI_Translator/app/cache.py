@@ -0,0 +1,298 @@
+# translation_service/cache.py
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_INLINE_WHITESPACE = re.compile(r"[ \t]+")
+
+# Approximate per-entry bookkeeping cost counted against the byte cap
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keys: NFC form, trimmed, with runs of spaces
+    and tabs collapsed. Line breaks are kept since they shape the output.
+    """
+    text = unicodedata.normalize("NFC", text).strip()
+    return _INLINE_WHITESPACE.sub(" ", text)
+
+
+def make_key(text: str, source_lang: str, target_lang: str) -> str:
+    """
+    Build the cache key of a translation.
+    """
+    return f"{source_lang}\x1f{target_lang}\x1f{normalize_text(text)}"
+
+
+class SQLiteCacheBackend:
+    """
+    Persistent cache store in a local SQLite file, survives restarts.
+
+    The connection is only used from one dedicated thread. Lookups are run
+    there with get_many_async, and writes are queued and committed there in
+    batches, so callers on the event loop never wait on SQLite.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation-cache")
+        # Queued writes by key, None deletes the row
+        self._pending: Dict[str, Optional[Tuple[str, float]]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._connection = self._io.submit(self._connect, path).result()
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.commit()
+        return connection
+
+    def _get_many(self, keys: List[str]) -> List[Optional[Tuple[str, float]]]:
+        # Runs on the SQLite thread, queued writes win over the file
+        with self._pending_lock:
+            pending = [self._pending.get(key, False) for key in keys]
+        rows = []
+        for key, queued in zip(keys, pending):
+            if queued is not False:
+                rows.append(queued)
+                continue
+            rows.append(self._connection.execute(
+                "SELECT value, expires_at FROM translations WHERE key = ?", (key,)
+            ).fetchone())
+        return rows
+
+    async def get_many_async(self, keys: List[str]) -> List[Optional[Tuple[str, float]]]:
+        """
+        Look up several keys in one trip to the SQLite thread.
+
+        :return: List of (value, expires_at) rows, None for missing keys
+        """
+        return await asyncio.wrap_future(self._io.submit(self._get_many, keys))
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        """
+        Queue a row for the next batched write.
+        """
+        self._queue(key, (value, expires_at))
+
+    def delete(self, key: str) -> None:
+        """
+        Queue a row deletion for the next batched write.
+        """
+        self._queue(key, None)
+
+    def _queue(self, key: str, row: Optional[Tuple[str, float]]) -> None:
+        with self._pending_lock:
+            self._pending[key] = row
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._io.submit(self._flush)
+
+    def _flush(self) -> None:
+        # Writes queued while a flush runs are committed together by the next one
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        if not pending:
+            return
+
+        try:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO translations (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, *row) for key, row in pending.items() if row is not None]
+            )
+            self._connection.executemany(
+                "DELETE FROM translations WHERE key = ?",
+                [(key,) for key, row in pending.items() if row is None]
+            )
+            self._connection.commit()
+        except sqlite3.Error as e:
+            self._connection.rollback()
+            logger.error(f"Translation cache write failed: {str(e)}")
+
+    def purge_expired(self, now: float) -> int:
+        """
+        Delete expired rows, blocking until done. Meant for startup.
+        """
+        def purge() -> int:
+            cursor = self._connection.execute(
+                "DELETE FROM translations WHERE expires_at <= ?", (now,)
+            )
+            self._connection.commit()
+            return cursor.rowcount
+
+        return self._io.submit(purge).result()
+
+    def close(self) -> None:
+        """
+        Write the queued rows and close the connection.
+        """
+        self._io.submit(self._flush)
+        self._io.submit(self._connection.close)
+        self._io.shutdown(wait=True)
+
+
+class TranslationCache:
+    """
+    In-memory LRU cache with a TTL and a byte-size cap, optionally backed
+    by a persistent store such as SQLiteCacheBackend.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400,
+        max_bytes: int = 64 * 1024 * 1024,
+        persistent: Optional[SQLiteCacheBackend] = None
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key.encode("utf-8")) + len(value.encode("utf-8")) + ENTRY_OVERHEAD_BYTES
+
+    async def get(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Look up a cached translation, falling back to the persistent store.
+        """
+        return (await self.get_many([(text, source_lang, target_lang)]))[0]
+
+    async def get_many(self, requests: List[Tuple[str, str, str]]) -> List[Optional[str]]:
+        """
+        Look up (text, source_lang, target_lang) translations. Memory misses
+        are looked up in the persistent store in one call off the event loop.
+        """
+        keys = [make_key(text, source_lang, target_lang) for text, source_lang, target_lang in requests]
+        now = time.time()
+        results = [self._get_memory(key, now) for key in keys]
+        missing = [position for position, value in enumerate(results) if value is None]
+
+        if missing and self.persistent is not None:
+            rows = await self.persistent.get_many_async([keys[position] for position in missing])
+            for position, row in zip(missing, rows):
+                if row is None:
+                    continue
+                value, expires_at = row
+                if expires_at > now:
+                    self._store(keys[position], value, expires_at)
+                    results[position] = value
+                    with self._lock:
+                        self.persistent_hits += 1
+                else:
+                    self.persistent.delete(keys[position])
+
+        with self._lock:
+            self.misses += sum(1 for value in results if value is None)
+        return results
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self._bytes -= size
+            self.expirations += 1
+            return None
+
+    def set(self, text: str, source_lang: str, target_lang: str, translated_text: str) -> None:
+        """
+        Cache a translation in memory and queue it for the persistent store.
+        """
+        key = make_key(text, source_lang, target_lang)
+        expires_at = time.time() + self.ttl
+        self._store(key, translated_text, expires_at)
+        if self.persistent is not None:
+            self.persistent.set(key, translated_text, expires_at)
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            # Evict least recently used entries until under the byte cap
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def close(self) -> None:
+        """
+        Write queued rows and close the persistent store, if any.
+        """
+        if self.persistent is not None:
+            self.persistent.close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache metrics for the /stats endpoint.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persistent": self.persistent is not None
+            }
+
+
+def create_cache_from_env() -> TranslationCache:
+    """
+    Build the translation cache from TRANSLATION_CACHE_* environment variables.
+    """
+    db_path = os.getenv("TRANSLATION_CACHE_DB")
+    persistent = SQLiteCacheBackend(db_path) if db_path else None
+    if persistent is not None:
+        persistent.purge_expired(time.time())
+
+    return TranslationCache(
+        ttl=float(os.getenv("TRANSLATION_CACHE_TTL", 86400)),
+        max_bytes=int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        persistent=persistent
+    )
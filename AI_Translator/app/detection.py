@@ -0,0 +1,240 @@
+# translation_service/detection.py
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from cache import normalize_text
+
+# Characters of a text inspected by the heuristic detector
+SAMPLE_CHARS = 1000
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Hiragana, Katakana and half-width Katakana
+KANA_RANGES = ((0x3040, 0x30FF), (0xFF66, 0xFF9F))
+
+# Unicode script ranges and the language they identify, checked in order
+SCRIPT_RANGES = [
+    ("ja", KANA_RANGES),
+    ("ko", ((0xAC00, 0xD7AF), (0x1100, 0x11FF))),     # Hangul
+    ("zh-CN", ((0x4E00, 0x9FFF), (0x3400, 0x4DBF))),  # CJK ideographs
+    ("ar", ((0x0600, 0x06FF), (0x0750, 0x077F))),
+    ("iw", ((0x0590, 0x05FF),)),
+    ("el", ((0x0370, 0x03FF),)),
+    ("hi", ((0x0900, 0x097F),)),
+    ("th", ((0x0E00, 0x0E7F),)),
+    ("ru", ((0x0400, 0x04FF),)),
+]
+
+# Letters telling Cyrillic languages apart from Russian
+CYRILLIC_MARKERS = {
+    "uk": set("іїєґ"),
+    "sr": set("ђјљњћџ"),
+}
+
+# Frequent function words and distinctive letters of Latin-script languages
+LATIN_PROFILES = {
+    "en": (
+        "the and of to in is you that it for was on are with as be this have "
+        "not but what can from they we will your my at by an do how",
+        ""
+    ),
+    "es": (
+        "el la de que y en los las es por un una con para no se su al lo "
+        "como pero más muy está hola qué dónde gracias",
+        "ñ¿¡"
+    ),
+    "fr": (
+        "le la les de des et est un une que qui dans pour pas sur au avec "
+        "je vous il elle ce nous sont bonjour merci où",
+        "çœèêëîâù"
+    ),
+    "de": (
+        "der die das und ist nicht ein eine zu den mit von sie ich es auf "
+        "für im dem sind wie guten danke wo",
+        "ßäöü"
+    ),
+    "it": (
+        "il lo la di che è e un una per non con sono del della gli le si "
+        "come ciao grazie dove questo anche",
+        "ìò"
+    ),
+    "pt": (
+        "o a os as de que e do da em um uma para não com por se mais "
+        "você obrigado olá onde está muito",
+        "ãõ"
+    ),
+}
+
+LATIN_WORDS = {lang: set(words.split()) for lang, (words, _) in LATIN_PROFILES.items()}
+LATIN_LETTERS = {lang: set(letters) for lang, (_, letters) in LATIN_PROFILES.items()}
+
+
+def _script_language(sample: str) -> Optional[Tuple[str, float]]:
+    """
+    Detect languages written in their own script from the share of letters in it.
+    """
+    letters = [ord(ch) for ch in sample if ch.isalpha()]
+    if not letters:
+        return None
+
+    for lang, ranges in SCRIPT_RANGES:
+        count = sum(1 for code in letters if any(low <= code <= high for low, high in ranges))
+        if count * 2 < len(letters):
+            continue
+
+        if lang == "zh-CN":
+            # Any kana among the ideographs makes it Japanese written mostly in kanji
+            if any(low <= code <= high for code in letters for low, high in KANA_RANGES):
+                return "ja", 0.9
+            # Kanji without any kana is most likely Chinese, but not certainly
+            return lang, 0.85
+        if lang == "ru":
+            lowered = set(sample.lower())
+            for marker_lang, markers in CYRILLIC_MARKERS.items():
+                if lowered & markers:
+                    return marker_lang, 0.9
+            return lang, 0.8
+        return lang, 0.95
+
+    return None
+
+
+def _latin_language(sample: str) -> Optional[Tuple[str, float]]:
+    """
+    Score Latin-script languages by function words and distinctive letters.
+    """
+    lowered = sample.lower()
+    words = _WORD.findall(lowered)
+    if not words:
+        return None
+
+    characters = set(lowered)
+    scores = {}
+    for lang in LATIN_PROFILES:
+        vocabulary = LATIN_WORDS[lang]
+        score = sum(1 for word in words if word in vocabulary)
+        score += 2 * len(characters & LATIN_LETTERS[lang])
+        scores[lang] = score
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, top), (_, second) = ranked[0], ranked[1]
+    if top == 0:
+        return None
+
+    # Confidence needs both a clear margin and a few pieces of evidence
+    margin = (top - second) / top
+    support = min(1.0, top / 3)
+    return best, margin * support
+
+
+def detect_locally(text: str) -> Tuple[Optional[str], float]:
+    """
+    Offline heuristic language detection.
+
+    :return: Tuple of the language code (None if unknown) and a confidence in [0, 1]
+    """
+    sample = text[:SAMPLE_CHARS]
+    result = _script_language(sample) or _latin_language(sample)
+    return result if result is not None else (None, 0.0)
+
+
+class LanguageDetector:
+    """
+    Local detection stage in front of the upstream detect call: a cache of
+    earlier detections followed by the offline heuristic detector.
+    """
+
+    def __init__(self, min_confidence: float = 0.6, cache_size: int = 10000):
+        self.min_confidence = min_confidence
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.cache_hits = 0
+        self.local_hits = 0
+        self.upstream_calls = 0
+        self.upstream_failures = 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        # Digest keys keep the cache size independent of text length
+        return hashlib.sha1(normalize_text(text).encode("utf-8")).digest()
+
+    def lookup(self, text: str) -> Optional[str]:
+        """
+        Detect the language without leaving the process.
+
+        :return: Language code, or None when the upstream detector should be asked
+        """
+        key = self._key(text)
+        with self._lock:
+            self.lookups += 1
+            lang = self._cache.get(key)
+            if lang is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return lang
+
+        lang, confidence = detect_locally(text)
+        if lang is None or confidence < self.min_confidence:
+            return None
+
+        with self._lock:
+            self.local_hits += 1
+        self._remember(key, lang)
+        return lang
+
+    def remember(self, text: str, lang: str) -> None:
+        """
+        Cache the upstream detection of a text.
+        """
+        with self._lock:
+            self.upstream_calls += 1
+        self._remember(self._key(text), lang)
+
+    def record_failure(self) -> None:
+        """
+        Count an upstream detection that failed.
+        """
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_failures += 1
+
+    def _remember(self, key: bytes, lang: str) -> None:
+        with self._lock:
+            self._cache[key] = lang
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Detection metrics for the /stats endpoint.
+        """
+        with self._lock:
+            avoided = self.cache_hits + self.local_hits
+            detections = avoided + self.upstream_calls
+            return {
+                "lookups": self.lookups,
+                "cache_hits": self.cache_hits,
+                "local_hits": self.local_hits,
+                "upstream_calls": self.upstream_calls,
+                "upstream_failures": self.upstream_failures,
+                "upstream_avoided": avoided,
+                "upstream_avoided_ratio": avoided / detections if detections else 0.0,
+                "cache_entries": len(self._cache)
+            }
+
+
+def create_detector_from_env() -> LanguageDetector:
+    """
+    Build the language detector from DETECTION_* environment variables.
+    """
+    return LanguageDetector(
+        min_confidence=float(os.getenv("DETECTION_MIN_CONFIDENCE", 0.6)),
+        cache_size=int(os.getenv("DETECTION_CACHE_SIZE", 10000))
+    )
@@ -0,0 +1,95 @@
+# translation_service/executor.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the worker pool and its queue are both full.
+    """
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking translator calls with a bounded queue and
+    per-call timeouts, so the event loop is never blocked by upstream I/O.
+    """
+
+    def __init__(self, max_workers: int = 16, max_queue: int = 64, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translator")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _release(self, _future) -> None:
+        # Runs when the call really finished, even after a timeout
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, function: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run a blocking function in the pool.
+
+        :raises QueueFullError: if max_workers + max_queue calls are already pending
+        :raises asyncio.TimeoutError: if the call takes longer than the timeout
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFullError("Translation queue is full")
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(function, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Pool metrics for the /stats endpoint.
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_executor_from_env() -> BoundedExecutor:
+    """
+    Build the translator pool from TRANSLATOR_* environment variables.
+    """
+    return BoundedExecutor(
+        max_workers=int(os.getenv("TRANSLATOR_WORKERS", 16)),
+        max_queue=int(os.getenv("TRANSLATOR_QUEUE_SIZE", 64)),
+        timeout=float(os.getenv("TRANSLATOR_TIMEOUT", 10))
+    )
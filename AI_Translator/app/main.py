@@ -1,24 +1,84 @@
 # translation_service/main.py
 import os
-from typing import List, Dict, Optional
+import asyncio
+import json
+import math
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Tuple
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from deep_translator import GoogleTranslator, exceptions
-import httpx
+from deep_translator import exceptions
 import logging
 import time
 from functools import lru_cache
+from backends import create_registry_from_env
+from batching import PackSplitError, SingleFlight, keep_whitespace, pack_segments, split_text
+from cache import create_cache_from_env, make_key
+from detection import create_detector_from_env
+from executor import QueueFullError, create_executor_from_env
+from metrics import MetricsMiddleware, MetricsRegistry
+from rate_limit import create_limiter_from_env
+from translation_memory import create_memory_from_env
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Translation backends, selected per language pair with TRANSLATION_* variables
+backend_registry = create_registry_from_env()
+
+# Bounded thread pool for the blocking backend calls
+translator_pool = create_executor_from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        # Load local models before serving, off the event loop
+        await asyncio.to_thread(backend_registry.load)
+        yield
+    finally:
+        # Also runs when startup fails or serving ends with an error
+        translator_pool.shutdown()
+        translation_cache.close()
+
+# Prometheus metrics served on /metrics
+metrics_registry = MetricsRegistry()
+request_latency = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+detect_latency = metrics_registry.histogram(
+    "translation_detect_duration_seconds", "Source language detection time", ("stage",)
+)
+upstream_latency = metrics_registry.histogram(
+    "translation_upstream_duration_seconds", "Backend translation call time", ("operation",)
+)
+upstream_errors = metrics_registry.counter(
+    "translation_upstream_errors_total", "Failed backend translation and detection calls", ("operation",)
+)
+cache_lookup_latency = metrics_registry.histogram(
+    "translation_cache_lookup_duration_seconds", "Translation cache lookup time", ("result",)
+)
+rate_limit_rejections = metrics_registry.counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter"
+)
+metrics_registry.gauge(
+    "translator_queue_depth", "Backend calls running or waiting in the translator pool",
+    lambda: translator_pool.stats()["pending"]
+)
+metrics_registry.gauge(
+    "translation_single_flight_in_flight", "Distinct backend translations in flight",
+    lambda: single_flight.stats()["in_flight"]
+)
+
 # Create FastAPI app
 app = FastAPI(
     title="Translation Service API",
     description="A robust translation service with rate limiting and error handling",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware to allow frontend communication
@@ -30,10 +90,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency of every endpoint
+app.add_middleware(MetricsMiddleware, histogram=request_latency)
+
 # Rate limiting configuration
 RATE_LIMIT_WINDOW = 60  # 1 minute window
 MAX_REQUESTS_PER_WINDOW = 100
-request_timestamps = {}
+rate_limiter = create_limiter_from_env(MAX_REQUESTS_PER_WINDOW, RATE_LIMIT_WINDOW)
+
+# Translation result cache, configured with TRANSLATION_CACHE_* variables
+translation_cache = create_cache_from_env()
+
+# Local language detection in front of the upstream detect call
+language_detector = create_detector_from_env()
+
+# Fuzzy reuse of near-duplicate segments, configured with TM_* variables
+translation_memory = create_memory_from_env()
+
+# Concurrent identical translations share one upstream call
+single_flight = SingleFlight()
+
+# Batch limits, packs stay below Google's 5000 character request limit
+MAX_BATCH_SEGMENTS = int(os.getenv("MAX_BATCH_SEGMENTS", 5000))
+UPSTREAM_MAX_CHARS = int(os.getenv("UPSTREAM_MAX_CHARS", 4500))
+
+# Streaming translation chunk size and chunks translated at the same time
+STREAM_CHUNK_CHARS = int(os.getenv("STREAM_CHUNK_CHARS", 1000))
+STREAM_CONCURRENCY = int(os.getenv("STREAM_CONCURRENCY", 4))
 
 # API request models
 class TranslationRequest(BaseModel):
@@ -46,28 +129,28 @@ class TranslationResponse(BaseModel):
     translated_text: str
     source_language: str
     target_language: str
+    match_score: Optional[float] = None
+
+class BatchTranslationRequest(BaseModel):
+    segments: List[str]
+    source_lang: Optional[str] = None
+    target_lang: str
+
+class BatchTranslationResponse(BaseModel):
+    translations: List[TranslationResponse]
 
 # Rate limiting dependency
-def rate_limit(request: Request):
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    global request_timestamps
-    request_timestamps = {
-        ip: timestamps 
-        for ip, timestamps in request_timestamps.items() 
-        if current_time - timestamps[-1] < RATE_LIMIT_WINDOW
-    }
+async def rate_limit(request: Request):
+    client_ip = request.client.host if request.client else "unknown"
+    allowed, retry_after = await rate_limiter.hit(client_ip)
     
-    if client_ip in request_timestamps:
-        if len(request_timestamps[client_ip]) >= MAX_REQUESTS_PER_WINDOW:
-            raise HTTPException(
-                status_code=429, 
-                detail="Too many requests. Please try again later."
-            )
-        request_timestamps[client_ip].append(current_time)
-    else:
-        request_timestamps[client_ip] = [current_time]
+    if not allowed:
+        rate_limit_rejections.inc()
+        raise HTTPException(
+            status_code=429, 
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
     
     return True
 
@@ -90,6 +173,150 @@ def get_supported_languages() -> List[Dict[str, str]]:
         {"code": "pt", "name": "Portuguese"}
     ]
 
+def detect_upstream(text: str) -> str:
+    """
+    Blocking language detection call, run in the translator pool.
+    """
+    try:
+        with detect_latency.time("upstream"):
+            return backend_registry.detect(text)
+    except Exception:
+        upstream_errors.inc("detect")
+        raise
+
+def translate_upstream(text: str, source_lang: str, target_lang: str) -> str:
+    """
+    Blocking translation call, run in the translator pool.
+    """
+    try:
+        with upstream_latency.time("translate"):
+            return backend_registry.translate(text, source_lang, target_lang)
+    except Exception:
+        upstream_errors.inc("translate")
+        raise
+
+def translate_pack_upstream(segments: List[str], source_lang: str, target_lang: str) -> List[str]:
+    """
+    Blocking translation of packed segments, run in the translator pool.
+    """
+    try:
+        with upstream_latency.time("batch"):
+            return backend_registry.translate_batch(segments, source_lang, target_lang)
+    except PackSplitError:
+        raise
+    except Exception:
+        upstream_errors.inc("batch")
+        raise
+
+def translation_error(error: Exception) -> HTTPException:
+    """
+    Map an exception raised while translating to an HTTP error.
+    """
+    if isinstance(error, HTTPException):
+        return error
+    if isinstance(error, QueueFullError):
+        return HTTPException(
+            status_code=503, 
+            detail="Translation service is busy. Please try again later.",
+            headers={"Retry-After": "1"}
+        )
+    if isinstance(error, asyncio.TimeoutError):
+        return HTTPException(
+            status_code=504, 
+            detail="Translation service timed out"
+        )
+    if isinstance(error, exceptions.LanguageNotSupportedException):
+        return HTTPException(
+            status_code=400, 
+            detail="One of the specified languages is not supported"
+        )
+    logger.error(f"Translation error: {str(error)}")
+    return HTTPException(
+        status_code=500, 
+        detail=f"Translation service error: {str(error)}"
+    )
+
+async def detect_source_lang(text: str) -> str:
+    """
+    Detect the language of a text, asking upstream only when local detection is not confident.
+    """
+    with detect_latency.time("local"):
+        source_lang = language_detector.lookup(text)
+    if source_lang is not None:
+        return source_lang
+
+    try:
+        source_lang = await translator_pool.run(detect_upstream, text)
+        language_detector.remember(text, source_lang)
+        return source_lang
+    except QueueFullError:
+        raise
+    except Exception:
+        language_detector.record_failure()
+        return 'auto'
+
+async def cached_translations(requests: List[Tuple[str, str, str]]) -> List[Optional[str]]:
+    """
+    Look up (text, source_lang, target_lang) translations in the cache,
+    timing the lookup. Persistent store reads run off the event loop.
+    """
+    start = time.perf_counter()
+    translations = await translation_cache.get_many(requests)
+    # One lookup serves the whole list, each result gets its share of the time
+    elapsed = (time.perf_counter() - start) / max(1, len(requests))
+    for translated_text in translations:
+        cache_lookup_latency.observe(elapsed, "miss" if translated_text is None else "hit")
+    return translations
+
+def remember_translations(translations: List[Tuple[str, str, str, str]]) -> None:
+    """
+    Store (text, source_lang, target_lang, translated_text) backend translations
+    in the cache and, in a background thread, the translation memory.
+    """
+    for text, source_lang, target_lang, translated_text in translations:
+        translation_cache.set(text, source_lang, target_lang, translated_text)
+    if translation_memory is not None and translations:
+        asyncio.get_running_loop().run_in_executor(None, translation_memory.add_many, translations)
+
+async def translate_cached(text: str, source_lang: str, target_lang: str, fuzzy: bool = False) -> Tuple[str, Optional[float]]:
+    """
+    Translate a text through the cache and, if fuzzy, the translation memory,
+    coalescing concurrent identical backend calls. These only ever see the text
+    without its surrounding whitespace, the translation gets it back from text.
+
+    :return: Tuple of the translation and its translation memory match score, if any
+    """
+    translated_text, match_score = await translate_core(text.strip(), source_lang, target_lang, fuzzy)
+    if translated_text is not None:
+        translated_text = keep_whitespace(text, translated_text)
+    return translated_text, match_score
+
+async def translate_core(text: str, source_lang: str, target_lang: str, fuzzy: bool) -> Tuple[str, Optional[float]]:
+    """
+    Translate a text without surrounding whitespace, see translate_cached.
+    """
+    translated_text = (await cached_translations([(text, source_lang, target_lang)]))[0]
+    if translated_text is not None:
+        return translated_text, None
+    
+    if fuzzy and translation_memory is not None:
+        match = await asyncio.to_thread(translation_memory.lookup, text, source_lang, target_lang)
+        if match is not None:
+            return match
+
+    async def call_upstream():
+        # Perform translation off the event loop
+        result = await translator_pool.run(translate_upstream, text, source_lang, target_lang)
+        if result is not None:
+            result = result.strip()
+            remember_translations([(text, source_lang, target_lang, result)])
+        
+        # Log translation event
+        logger.info(f"Translation: {source_lang} -> {target_lang}")
+        return result
+
+    return await single_flight.run(make_key(text, source_lang, target_lang), call_upstream), None
+
 @app.get("/languages", response_model=List[Dict[str, str]])
 def list_supported_languages():
     """
@@ -115,42 +342,239 @@ async def translate_text(
         
         # Detect source language if not provided
         if not translation_request.source_lang:
-            try:
-                source_lang = GoogleTranslator().detect(translation_request.text)
-            except Exception:
-                source_lang = 'auto'
+            source_lang = await detect_source_lang(translation_request.text)
         else:
             source_lang = translation_request.source_lang
         
-        # Perform translation
-        translator = GoogleTranslator(
-            source=source_lang, 
-            target=translation_request.target_lang
+        translated_text, match_score = await translate_cached(
+            translation_request.text, source_lang, translation_request.target_lang, fuzzy=True
         )
         
-        translated_text = translator.translate(translation_request.text)
-        
-        # Log translation event
-        logger.info(f"Translation: {source_lang} -> {translation_request.target_lang}")
-        
         return TranslationResponse(
             original_text=translation_request.text,
             translated_text=translated_text,
             source_language=source_lang,
-            target_language=translation_request.target_lang
+            target_language=translation_request.target_lang,
+            match_score=match_score
         )
     
-    except exceptions.LanguageNotSupportedException:
-        raise HTTPException(
-            status_code=400, 
-            detail="One of the specified languages is not supported"
-        )
     except Exception as e:
-        logger.error(f"Translation error: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Translation service error: {str(e)}"
+        raise translation_error(e)
+
+@app.post("/translate/batch", response_model=BatchTranslationResponse)
+async def translate_batch(
+    batch_request: BatchTranslationRequest, 
+    _: bool = Depends(rate_limit)
+):
+    """
+    Translate many segments at once. Identical segments are translated once,
+    and segments are grouped by language pair and packed into as few upstream
+    calls as the request size limit allows. Segments without a source language
+    that local detection can't identify are translated with source 'auto'
+    rather than costing an upstream detect call each.
+    """
+    led: Dict[str, asyncio.Future] = {}
+    try:
+        segments = batch_request.segments
+        target_lang = batch_request.target_lang
+        if len(segments) > MAX_BATCH_SEGMENTS:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"At most {MAX_BATCH_SEGMENTS} segments per batch"
+            )
+        
+        sources = [
+            batch_request.source_lang or language_detector.lookup(text) or 'auto'
+            for text in segments
+        ]
+        
+        results: Dict[str, str] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        groups: Dict[str, List[str]] = {}
+        
+        # Deduplicate, then serve from the cache or from in-flight calls. Only the
+        # segments without surrounding whitespace are translated and cached
+        unique: Dict[str, Tuple[str, str]] = {}
+        for text, source_lang in zip(segments, sources):
+            if text.strip():
+                unique.setdefault(make_key(text, source_lang, target_lang), (text.strip(), source_lang))
+        
+        cached = await cached_translations([
+            (text, source_lang, target_lang) for text, source_lang in unique.values()
+        ])
+        for (key, (text, source_lang)), translated_text in zip(unique.items(), cached):
+            if translated_text is not None:
+                results[key] = translated_text
+                continue
+            
+            future = single_flight.join(key)
+            if future is not None:
+                waiting[key] = future
+                continue
+            
+            waiting[key] = led[key] = single_flight.lead(key)
+            groups.setdefault(source_lang, []).append(text)
+        
+        packs = [
+            (source_lang, pack)
+            for source_lang, texts in groups.items()
+            for pack in pack_segments(texts, UPSTREAM_MAX_CHARS)
+        ]
+        outcomes = await asyncio.gather(
+            *(translator_pool.run(translate_pack_upstream, pack, source_lang, target_lang)
+              for source_lang, pack in packs),
+            return_exceptions=True
         )
+        
+        # Packs that didn't split back are retried segment by segment, each call in its own pool slot
+        unsplit = [position for position, outcome in enumerate(outcomes) if isinstance(outcome, PackSplitError)]
+        retried = await asyncio.gather(*(
+            asyncio.gather(
+                *(translator_pool.run(translate_upstream, text, packs[position][0], target_lang)
+                  for text in packs[position][1]),
+                return_exceptions=True
+            )
+            for position in unsplit
+        ))
+        for position, pack_results in zip(unsplit, retried):
+            outcomes[position] = pack_results
+        
+        translated = []
+        for (source_lang, pack), outcome in zip(packs, outcomes):
+            for index, text in enumerate(pack):
+                key = make_key(text, source_lang, target_lang)
+                result = outcome if isinstance(outcome, BaseException) else outcome[index]
+                if isinstance(result, BaseException):
+                    single_flight.fail(key, result)
+                    continue
+                if result is not None:
+                    result = result.strip()
+                    translated.append((text, source_lang, target_lang, result))
+                single_flight.resolve(key, result)
+            if not isinstance(outcome, BaseException):
+                logger.info(f"Batch translation: {source_lang} -> {target_lang}, {len(pack)} segments")
+        remember_translations(translated)
+        
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        
+        def segment_translation(text: str, source_lang: str) -> str:
+            # Whitespace-only segments are returned as they are
+            translated_text = results.get(make_key(text, source_lang, target_lang), text)
+            return keep_whitespace(text, translated_text) if translated_text else ""
+        
+        return BatchTranslationResponse(translations=[
+            TranslationResponse(
+                original_text=text,
+                translated_text=segment_translation(text, source_lang),
+                source_language=source_lang,
+                target_language=target_lang
+            )
+            for text, source_lang in zip(segments, sources)
+        ])
+    
+    except Exception as e:
+        raise translation_error(e)
+    finally:
+        # Never leave followers waiting on calls this request didn't finish
+        for key, future in led.items():
+            if not future.done():
+                single_flight.fail(key, RuntimeError("Batch translation was aborted"))
+
+@app.post("/translate/stream")
+async def translate_stream(
+    translation_request: TranslationRequest, 
+    _: bool = Depends(rate_limit)
+):
+    """
+    Translate a large text chunk by chunk. The text is split on paragraph and
+    sentence boundaries, up to STREAM_CONCURRENCY chunks are translated at a
+    time, and results are streamed in order as newline-delimited JSON.
+    Joining translated_text and separator of all lines rebuilds the document.
+    """
+    try:
+        # Validate input
+        if not translation_request.text:
+            raise HTTPException(
+                status_code=400, 
+                detail="Text to translate cannot be empty"
+            )
+        
+        chunks = split_text(translation_request.text, STREAM_CHUNK_CHARS)
+        target_lang = translation_request.target_lang
+        
+        # Detect the source language once, from the first chunk with text
+        if not translation_request.source_lang:
+            sample = next((chunk for chunk, _ in chunks if chunk.strip()), chunks[0][0])
+            source_lang = await detect_source_lang(sample)
+        else:
+            source_lang = translation_request.source_lang
+    
+    except Exception as e:
+        raise translation_error(e)
+    
+    async def translate_chunk(chunk: str) -> str:
+        if not chunk.strip():
+            return chunk
+        translated_text, _ = await translate_cached(chunk, source_lang, target_lang)
+        return translated_text
+    
+    def result_line(index: int, chunk: str, separator: str, translated_text: str) -> str:
+        return json.dumps({
+            "index": index,
+            "original_text": chunk,
+            "translated_text": translated_text,
+            "separator": separator,
+            "source_language": source_lang,
+            "target_language": target_lang
+        }, ensure_ascii=False) + "\n"
+    
+    async def stream_results():
+        pending = deque()
+        try:
+            # Keep a bounded window of chunks in flight, emit its head in order
+            for index, (chunk, separator) in enumerate(chunks):
+                pending.append((index, chunk, separator, asyncio.ensure_future(translate_chunk(chunk))))
+                if len(pending) >= STREAM_CONCURRENCY:
+                    index, chunk, separator, task = pending.popleft()
+                    yield result_line(index, chunk, separator, await task)
+            
+            while pending:
+                index, chunk, separator, task = pending.popleft()
+                yield result_line(index, chunk, separator, await task)
+        
+        except Exception as e:
+            # The status line is already sent, report the error in the stream
+            yield json.dumps({"error": translation_error(e).detail}) + "\n"
+        finally:
+            for *_, task in pending:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/stats")
+def service_stats():
+    """
+    Translation cache, language detection and translator pool metrics
+    """
+    return {
+        "translation_cache": translation_cache.stats(),
+        "language_detection": language_detector.stats(),
+        "translator_pool": translator_pool.stats(),
+        "single_flight": single_flight.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "backends": backend_registry.stats(),
+        "translation_memory": translation_memory.stats() if translation_memory is not None else None
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Latency histograms and counters in the Prometheus text format
+    """
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 # Health check endpoint
 @app.get("/health")
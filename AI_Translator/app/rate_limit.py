@@ -0,0 +1,147 @@
+# translation_service/rate_limit.py
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class LocalStore:
+    """
+    In-process sliding-window counters. Stand-in for a shared store when
+    only one worker runs; limits are per worker otherwise.
+    """
+
+    def __init__(self):
+        # client -> [window index, count in that window, count in the window before]
+        self._counters: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def increment(self, client: str, window_index: int, limit: float, weight: float) -> Tuple[bool, int, int]:
+        """
+        Count a request of a client if its estimated rate is below the limit.
+
+        :return: Tuple of (allowed, current window count, previous window count)
+        """
+        with self._lock:
+            counter = self._counters.get(client)
+            if counter is None:
+                counter = self._counters[client] = [window_index, 0, 0]
+            else:
+                self._counters.move_to_end(client)
+
+            if counter[0] != window_index:
+                counter[2] = counter[1] if counter[0] == window_index - 1 else 0
+                counter[1] = 0
+                counter[0] = window_index
+
+            allowed = counter[1] + counter[2] * weight < limit
+            if allowed:
+                counter[1] += 1
+
+            # Clients are ordered by last request, drop those idle for two windows
+            while self._counters:
+                oldest = next(iter(self._counters.values()))
+                if oldest[0] >= window_index - 1:
+                    break
+                self._counters.popitem(last=False)
+
+            return allowed, counter[1], counter[2]
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class RedisStore:
+    """
+    Sliding-window counters in Redis, shared by all uvicorn workers.
+    """
+
+    def __init__(self, url: str, window: float, prefix: str = "rate_limit"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._window = window
+        self._prefix = prefix
+
+    async def increment(self, client: str, window_index: int, limit: float, weight: float) -> Tuple[bool, int, int]:
+        current_key = f"{self._prefix}:{client}:{window_index}"
+        previous_key = f"{self._prefix}:{client}:{window_index - 1}"
+
+        pipeline = self._redis.pipeline()
+        pipeline.incr(current_key)
+        pipeline.expire(current_key, math.ceil(self._window * 2))
+        pipeline.get(previous_key)
+        current, _, previous = await pipeline.execute()
+        previous = int(previous or 0)
+
+        # Give the slot back when over the limit, rejected requests don't count
+        allowed = (current - 1) + previous * weight < limit
+        if not allowed:
+            current = await self._redis.decr(current_key)
+        return allowed, int(current), previous
+
+    def __len__(self) -> int:
+        return 0
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window counter rate limiter: the rate of a client is estimated
+    from its count in the current fixed window plus the part of the previous
+    window's count that still overlaps the sliding window. O(1) per request.
+    """
+
+    def __init__(self, limit: int, window: float, store=None):
+        self.limit = limit
+        self.window = window
+        self.store = store if store is not None else LocalStore()
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, client: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Record a request of a client.
+
+        :return: Tuple of (allowed, seconds until a retry can succeed)
+        """
+        now = time.time() if now is None else now
+        window_index = int(now // self.window)
+        elapsed = now - window_index * self.window
+        weight = 1 - elapsed / self.window
+
+        allowed, current, previous = await self.store.increment(client, window_index, self.limit, weight)
+        if allowed:
+            self.allowed += 1
+            return True, 0.0
+
+        self.rejected += 1
+        if previous and current < self.limit:
+            # Wait until enough of the previous window has slid out
+            needed_weight = (self.limit - current) / previous
+            retry_after = (1 - needed_weight) * self.window - elapsed
+        else:
+            retry_after = self.window - elapsed
+        return False, max(retry_after, 0.0)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Limiter metrics for the /stats endpoint.
+        """
+        return {
+            "limit": self.limit,
+            "window": self.window,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "tracked_clients": len(self.store)
+        }
+
+
+def create_limiter_from_env(limit: int, window: float) -> SlidingWindowLimiter:
+    """
+    Build the rate limiter, shared through Redis when RATE_LIMIT_REDIS_URL is set.
+    """
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    store = RedisStore(redis_url, window) if redis_url else LocalStore()
+    return SlidingWindowLimiter(limit, window, store)
@@ -0,0 +1,216 @@
+# translation_service/translation_memory.py
+import operator
+import os
+import random
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from cache import normalize_text
+
+# Candidates whose estimated similarity is this far below the threshold are skipped
+ESTIMATE_SLACK = 0.2
+
+
+def shingles(text: str, size: int = 4) -> Set[int]:
+    """
+    Hashed character n-grams of the lowercased, normalized text.
+    """
+    text = normalize_text(text).lower()
+    if len(text) <= size:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+
+
+def jaccard(features: Set[int], stored: "array[int]") -> float:
+    """
+    Jaccard similarity of a shingle set and a stored array of distinct shingles.
+    """
+    shared = len(features.intersection(stored))
+    union = len(features) + len(stored) - shared
+    return shared / union if union else 1.0
+
+
+class TranslationMemory:
+    """
+    Past source/target segment pairs per language pair with a MinHash LSH
+    index for fuzzy lookup. Signatures are split into bands; segments sharing
+    a band with the query are candidates, pre-filtered by signature agreement
+    and scored by the exact Jaccard similarity of their character n-grams,
+    which are stored with each segment as a compact array. Memory is bounded
+    by max_segments, least recently used segments are evicted first.
+
+    Lookups and additions are CPU work, callers on an event loop should run
+    them in a thread.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_segments: int = 100000,
+        max_chars: int = 500,
+        bands: int = 8,
+        rows: int = 4,
+        bucket_size: int = 32,
+        seed: int = 1
+    ):
+        self.threshold = threshold
+        self.max_segments = max_segments
+        self.max_chars = max_chars
+        self.bands = bands
+        self.rows = rows
+        self.bucket_size = bucket_size
+
+        # XOR masks act as the hash permutations of the n-gram CRCs
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(32) for _ in range(bands * rows)]
+
+        # segment id -> (language pair, source text, target text, signature, shingles), in LRU order
+        self._segments: "OrderedDict[int, Tuple[Tuple[str, str], str, str, Tuple[int, ...], array]]" = OrderedDict()
+        # (language pair, band key) -> ids of segments in that bucket, oldest first
+        self._buckets: Dict[Tuple[Tuple[str, str], int], List[int]] = {}
+        # (language pair, normalized source) -> segment id, for exact replacement
+        self._exact: Dict[Tuple[Tuple[str, str], str], int] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def _signature(self, features: Set[int]) -> Tuple[int, ...]:
+        return tuple(min(map(mask.__xor__, features)) for mask in self._masks)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[int]:
+        return [
+            hash((band, tuple(signature[band * self.rows:(band + 1) * self.rows])))
+            for band in range(self.bands)
+        ]
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[Tuple[str, float]]:
+        """
+        Find the stored translation of the most similar segment.
+
+        :return: Tuple of (translation, similarity), or None below the threshold
+        """
+        if len(text) > self.max_chars:
+            return None
+
+        pair = (source_lang, target_lang)
+        features = shingles(text)
+        signature = self._signature(features)
+        min_agreement = (self.threshold - ESTIMATE_SLACK) * len(signature)
+
+        band_keys = self._band_keys(signature)
+
+        with self._lock:
+            self.lookups += 1
+            candidate_ids = set()
+            for band_key in band_keys:
+                candidate_ids.update(self._buckets.get((pair, band_key), ()))
+            candidates = [(segment_id, self._segments[segment_id]) for segment_id in candidate_ids]
+
+        # Segments are immutable tuples, score them without holding the lock
+        best, best_score = None, 0.0
+        for segment_id, segment in candidates:
+            _, _, _, candidate_signature, candidate_features = segment
+            agreement = sum(map(operator.eq, signature, candidate_signature))
+            if agreement < min_agreement:
+                continue
+            score = jaccard(features, candidate_features)
+            if score > best_score:
+                best, best_score = (segment_id, segment), score
+
+        if best is None or best_score < self.threshold:
+            return None
+
+        segment_id, segment = best
+        with self._lock:
+            self.hits += 1
+            if segment_id in self._segments:
+                self._segments.move_to_end(segment_id)
+        return segment[2], best_score
+
+    def add(self, text: str, source_lang: str, target_lang: str, translated_text: str) -> None:
+        """
+        Store a translated segment.
+        """
+        if len(text) > self.max_chars or not text.strip():
+            return
+
+        pair = (source_lang, target_lang)
+        features = shingles(text)
+        signature = self._signature(features)
+        segment = (pair, text, translated_text, signature, array("I", features))
+        exact_key = (pair, normalize_text(text))
+
+        with self._lock:
+            previous_id = self._exact.get(exact_key)
+            if previous_id is not None:
+                self._segments[previous_id] = segment
+                self._segments.move_to_end(previous_id)
+                return
+
+            segment_id = self._next_id
+            self._next_id += 1
+            self._segments[segment_id] = segment
+            self._exact[exact_key] = segment_id
+
+            for band_key in self._band_keys(signature):
+                bucket = self._buckets.setdefault((pair, band_key), [])
+                bucket.append(segment_id)
+                # Hot buckets of common phrasings keep their newest segments
+                if len(bucket) > self.bucket_size:
+                    del bucket[0]
+
+            while len(self._segments) > self.max_segments:
+                self._evict()
+
+    def add_many(self, segments: Iterable[Tuple[str, str, str, str]]) -> None:
+        """
+        Store (text, source_lang, target_lang, translated_text) segments.
+        """
+        for text, source_lang, target_lang, translated_text in segments:
+            self.add(text, source_lang, target_lang, translated_text)
+
+    def _evict(self) -> None:
+        segment_id, (pair, text, _, signature, _) = self._segments.popitem(last=False)
+        self._exact.pop((pair, normalize_text(text)), None)
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get((pair, band_key))
+            if bucket is not None and segment_id in bucket:
+                bucket.remove(segment_id)
+                if not bucket:
+                    del self._buckets[(pair, band_key)]
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Translation memory metrics for the /stats endpoint.
+        """
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "max_segments": self.max_segments,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "evictions": self.evictions
+            }
+
+
+def create_memory_from_env() -> Optional[TranslationMemory]:
+    """
+    Build the translation memory from TM_* environment variables. It is off
+    unless TM_ENABLED is set, since fuzzy matches can differ from a fresh
+    translation; returns None when disabled.
+    """
+    if os.getenv("TM_ENABLED", "0").lower() not in ("1", "true", "yes"):
+        return None
+
+    return TranslationMemory(
+        threshold=float(os.getenv("TM_THRESHOLD", 0.9)),
+        max_segments=int(os.getenv("TM_MAX_SEGMENTS", 100000)),
+        max_chars=int(os.getenv("TM_MAX_CHARS", 500))
+    )
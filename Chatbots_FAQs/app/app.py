@@ -1,8 +1,13 @@
 from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
 import json
 import os
+import threading
 from werkzeug.utils import secure_filename
-from chat import FAQChatbot  
+from chat import FAQChatbot, configure_caches, ensure_nltk_resources, get_cache_stats
+from config import (
+    ENGINE, INDEX_FOLDER, LEMMA_CACHE_SIZE, MAX_BATCH_MESSAGES, MAX_BATCH_TOP_K, NLTK_PACKAGES,
+    TEXT_CACHE_SIZE, TOKENIZER, allowed_file, default_faq_data, validate_faq_data
+)
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
@@ -10,7 +15,6 @@ app.secret_key = os.getenv('keys')  # Required for flash messages
 
 # Configure upload settings
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'json', 'txt'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -18,55 +22,19 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Initialize chatbot with default FAQ data
-default_faq_data = [
-    {
-        'question': 'Hello',
-        'answer': 'Hi, what can I assist you with?'
-    },
-    {
-        'question': 'Hi',
-        'answer': 'Hello! How may I help you today?'
-    },
-    {
-        'question': '1',
-        'answer': 'You can upload a JSON file with FAQ data to help me better answer your questions. The file should contain a list of question-answer pairs.'
-    },
-    {
-        'question': 'help',
-        'answer': 'You can upload a JSON file with FAQ data to help me better answer your questions. The file should contain a list of question-answer pairs.'
-    },
-    {
-        'question': 'How do I use this?',
-        'answer': 'To get started, you can upload a JSON file containing your FAQ data. The file should include questions and their corresponding answers.'
-    }
-]
-    
-chatbot = FAQChatbot(default_faq_data)
+# Check local NLTK data once at startup, downloads are skipped with NLTK_OFFLINE=1
+missing_nltk_data = ensure_nltk_resources(NLTK_PACKAGES)
+if missing_nltk_data:
+    print(f"Warning: Missing NLTK data: {', '.join(missing_nltk_data)}")
 
-def allowed_file(filename):
-    """Check if the uploaded file has an allowed extension"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+configure_caches(text_cache_size=TEXT_CACHE_SIZE, lemma_cache_size=LEMMA_CACHE_SIZE)
 
-def validate_faq_data(data):
-    """Validate the structure of uploaded FAQ data"""
-    if not isinstance(data, list):
-        return False, "FAQ data must be a list"
-    
-    for item in data:
-        if not isinstance(item, dict):
-            return False, "Each FAQ item must be a dictionary"
-        
-        if 'question' not in item or 'answer' not in item:
-            return False, "Each FAQ item must contain 'question' and 'answer' keys"
-        
-        if not isinstance(item['question'], str) or not isinstance(item['answer'], str):
-            return False, "Question and answer must be strings"
-        
-        if not item['question'].strip() or not item['answer'].strip():
-            return False, "Question and answer cannot be empty"
-    
-    return True, "Data is valid"
+# Initialize chatbot with default FAQ data
+chatbot = FAQChatbot.load_or_build(default_faq_data, INDEX_FOLDER, engine=ENGINE, tokenizer=TOKENIZER)
+
+# Serializes chatbot replacement and incremental updates; /chat reads the
+# global once per request, so it always sees a complete index
+chatbot_lock = threading.Lock()
 
 @app.route('/')
 def index():
@@ -100,9 +68,16 @@ def upload_file():
                 flash(f'Invalid FAQ data format: {message}')
                 return redirect(url_for('index'))
             
-            # Update chatbot with new FAQ data
+            # Build the new chatbot first, then swap it in at once
+            new_chatbot = FAQChatbot.load_or_build(faq_data, INDEX_FOLDER, engine=ENGINE, tokenizer=TOKENIZER)
             global chatbot
-            chatbot = FAQChatbot(faq_data)
+            with chatbot_lock:
+                chatbot = new_chatbot
+            
+            # Superseded snapshots stay readable while mapped, so only the new one is kept
+            snapshot_path = FAQChatbot.snapshot_path(faq_data, INDEX_FOLDER, TOKENIZER)
+            if os.path.exists(snapshot_path):
+                FAQChatbot.prune_snapshots(INDEX_FOLDER, [snapshot_path])
             
             flash('FAQ data successfully uploaded and updated')
             return redirect(url_for('index'))
@@ -129,5 +104,84 @@ def chat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('messages'), list):
+            return jsonify({'error': 'Invalid request'}), 400
+        
+        messages = data['messages']
+        if len(messages) > MAX_BATCH_MESSAGES:
+            return jsonify({'error': f'At most {MAX_BATCH_MESSAGES} messages per batch'}), 400
+        if not all(isinstance(message, str) for message in messages):
+            return jsonify({'error': 'Messages must be strings'}), 400
+        
+        top_k = data.get('top_k', 3)
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_BATCH_TOP_K:
+            return jsonify({'error': f'top_k must be an integer between 1 and {MAX_BATCH_TOP_K}'}), 400
+        
+        results = chatbot.generate_responses(messages, k=top_k)
+        
+        return jsonify({'results': results})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_faq_id(faq_id):
+    """Convert a FAQ id from the URL, numeric ids are integers like in faqs.json"""
+    try:
+        return int(faq_id)
+    except ValueError:
+        return faq_id
+
+@app.route('/faqs', methods=['GET'])
+def list_faqs():
+    return jsonify({'faqs': chatbot.faq_data})
+
+@app.route('/faqs', methods=['POST'])
+def add_faq():
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Invalid request'}), 400
+    
+    try:
+        with chatbot_lock:
+            faq = chatbot.add_faq(data)
+        return jsonify({'faq': faq}), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/faqs/<faq_id>', methods=['PUT'])
+def update_faq(faq_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Invalid request'}), 400
+    
+    try:
+        with chatbot_lock:
+            faq = chatbot.update_faq(parse_faq_id(faq_id), data)
+        return jsonify({'faq': faq})
+    except KeyError:
+        return jsonify({'error': 'FAQ not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/faqs/<faq_id>', methods=['DELETE'])
+def delete_faq(faq_id):
+    try:
+        with chatbot_lock:
+            chatbot.delete_faq(parse_faq_id(faq_id))
+        return '', 204
+    except KeyError:
+        return jsonify({'error': 'FAQ not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Report hit/miss counters of the preprocessing caches"""
+    return jsonify(get_cache_stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
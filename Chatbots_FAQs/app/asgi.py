@@ -0,0 +1,224 @@
+"""
+ASGI serving mode of the FAQ chatbot.
+
+Serves the same '/', '/upload', '/chat' and '/chat/batch' contract as app.py,
+but matching runs in a process pool sized to the CPU cores while the event
+loop only handles I/O. Pool processes load the current FAQ index from its
+snapshot (see FAQChatbot.load_index), so an upload is published to all of
+them by switching the snapshot path.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.staticfiles import StaticFiles
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from starlette.middleware.sessions import SessionMiddleware
+
+from chat import FAQChatbot, configure_caches, ensure_nltk_resources
+from config import (
+    ENGINE, INDEX_FOLDER, LEMMA_CACHE_SIZE, MAX_BATCH_MESSAGES, MAX_BATCH_TOP_K, NLTK_PACKAGES,
+    TEXT_CACHE_SIZE, TOKENIZER, allowed_file, default_faq_data, validate_faq_data
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Matching processes, one per core by default
+POOL_SIZE = int(os.getenv('CHAT_POOL_SIZE', os.cpu_count() or 1))
+
+# Messages of a /chat/batch request handed to one pool process at a time
+BATCH_CHUNK_SIZE = 500
+
+# Chatbot of a pool process and the snapshot it was loaded from
+_worker_chatbot = None
+_worker_snapshot = None
+
+
+def _init_worker():
+    """Configure the preprocessing caches of a pool process."""
+    configure_caches(text_cache_size=TEXT_CACHE_SIZE, lemma_cache_size=LEMMA_CACHE_SIZE)
+
+
+def _get_worker_chatbot(snapshot_path):
+    """
+    Get the chatbot of this pool process, reloading it when the snapshot changed.
+
+    :param snapshot_path: Index snapshot of the current FAQ data
+    :return: FAQChatbot instance
+    """
+    global _worker_chatbot, _worker_snapshot
+    if snapshot_path != _worker_snapshot:
+        _worker_chatbot = FAQChatbot.load_index(snapshot_path, engine=ENGINE)
+        _worker_snapshot = snapshot_path
+    return _worker_chatbot
+
+
+def respond(snapshot_path, message):
+    """Answer one message in a pool process."""
+    return _get_worker_chatbot(snapshot_path).generate_response(message)
+
+
+def respond_batch(snapshot_path, messages, top_k):
+    """Answer a chunk of messages in a pool process."""
+    return _get_worker_chatbot(snapshot_path).generate_responses(messages, k=top_k)
+
+
+def build_snapshot(faq_data):
+    """
+    Build (or reuse) the index snapshot of FAQ data in a pool process.
+
+    :param faq_data: List of dictionaries with 'question' and 'answer' keys
+    :return: Path of the snapshot
+    """
+    FAQChatbot.load_or_build(faq_data, INDEX_FOLDER, engine=ENGINE, tokenizer=TOKENIZER)
+    path = FAQChatbot.snapshot_path(faq_data, INDEX_FOLDER, TOKENIZER)
+    if not os.path.exists(path):
+        raise OSError(f"Index snapshot {path} could not be written")
+    return os.path.abspath(path)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    missing_nltk_data = ensure_nltk_resources(NLTK_PACKAGES)
+    if missing_nltk_data:
+        print(f"Warning: Missing NLTK data: {', '.join(missing_nltk_data)}")
+
+    # Spawned processes don't inherit the event loop threads of this one
+    app.state.pool = ProcessPoolExecutor(
+        max_workers=POOL_SIZE,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    )
+    app.state.snapshot_path = await run_in_pool(build_snapshot, default_faq_data)
+    try:
+        yield
+    finally:
+        app.state.pool.shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="FAQ Chatbot", lifespan=lifespan)
+app.add_middleware(SessionMiddleware, secret_key=os.getenv('keys') or os.urandom(32).hex())
+app.mount('/static', StaticFiles(directory=os.path.join(BASE_DIR, 'static')), name='static')
+
+templates = Environment(
+    loader=FileSystemLoader(os.path.join(BASE_DIR, 'templates')),
+    autoescape=select_autoescape()
+)
+
+
+async def run_in_pool(function, *args):
+    """Run a function in the process pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(app.state.pool, function, *args)
+
+
+def flash(request, message):
+    """Store a message for the next page render, like Flask's flash"""
+    request.session.setdefault('_flashes', []).append(message)
+
+
+def url_for(endpoint, filename=None):
+    """Resolve the Flask-style url_for calls of the templates"""
+    if endpoint == 'static':
+        return app.url_path_for('static', path=filename)
+    return app.url_path_for(endpoint)
+
+
+@app.get('/', response_class=HTMLResponse)
+async def index(request: Request):
+    messages = request.session.pop('_flashes', [])
+    return templates.get_template('index.html').render(
+        url_for=url_for,
+        get_flashed_messages=lambda: messages
+    )
+
+
+@app.post('/upload')
+async def upload_file(request: Request, file: UploadFile = File(None)):
+    redirect = RedirectResponse(url_for('index'), status_code=302)
+
+    if file is None or not file.filename:
+        flash(request, 'No file selected')
+        return redirect
+
+    if not allowed_file(file.filename):
+        flash(request, 'Invalid file type. Please upload a JSON or TXT file')
+        return redirect
+
+    try:
+        # Read and parse the file content
+        content = (await file.read()).decode('utf-8')
+        faq_data = json.loads(content)
+
+        # Validate FAQ data structure
+        is_valid, message = validate_faq_data(faq_data)
+        if not is_valid:
+            flash(request, f'Invalid FAQ data format: {message}')
+            return redirect
+
+        # Pool processes pick up the new snapshot on their next request
+        previous_path = app.state.snapshot_path
+        app.state.snapshot_path = await run_in_pool(build_snapshot, faq_data)
+        # Requests started before the switch may still load the previous snapshot
+        FAQChatbot.prune_snapshots(INDEX_FOLDER, [app.state.snapshot_path, previous_path])
+
+        flash(request, 'FAQ data successfully uploaded and updated')
+    except json.JSONDecodeError:
+        flash(request, 'Invalid JSON format')
+    except Exception as e:
+        flash(request, f'Error processing file: {str(e)}')
+
+    return redirect
+
+
+@app.post('/chat')
+async def chat(request: Request):
+    try:
+        data = await request.json()
+        if not isinstance(data, dict) or 'message' not in data:
+            return JSONResponse({'error': 'Invalid request'}, status_code=400)
+
+        response = await run_in_pool(respond, app.state.snapshot_path, data['message'])
+
+        return {'response': response}
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.post('/chat/batch')
+async def chat_batch(request: Request):
+    try:
+        data = await request.json()
+        if not isinstance(data, dict) or not isinstance(data.get('messages'), list):
+            return JSONResponse({'error': 'Invalid request'}, status_code=400)
+
+        messages = data['messages']
+        if len(messages) > MAX_BATCH_MESSAGES:
+            return JSONResponse({'error': f'At most {MAX_BATCH_MESSAGES} messages per batch'}, status_code=400)
+        if not all(isinstance(message, str) for message in messages):
+            return JSONResponse({'error': 'Messages must be strings'}, status_code=400)
+
+        top_k = data.get('top_k', 3)
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_BATCH_TOP_K:
+            return JSONResponse(
+                {'error': f'top_k must be an integer between 1 and {MAX_BATCH_TOP_K}'}, status_code=400
+            )
+
+        # Spread large batches over the pool, chunks come back in request order
+        snapshot_path = app.state.snapshot_path
+        chunks = await asyncio.gather(*(
+            run_in_pool(respond_batch, snapshot_path, messages[start:start + BATCH_CHUNK_SIZE], top_k)
+            for start in range(0, len(messages), BATCH_CHUNK_SIZE)
+        ))
+
+        return {'results': [result for chunk in chunks for result in chunk]}
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
@@ -0,0 +1,88 @@
+"""
+Check and time the /chat/batch endpoint of the Flask app with every FAQ_ENGINE.
+
+Each engine runs in a fresh interpreter with FAQ_ENGINE set, like a worker
+started with that setting: the FAQ file is uploaded through /upload, then
+variations of its questions are sent to /chat/batch. Exits with status 1
+when the app didn't pick up the engine or the engines disagree on the matches.
+
+Usage: python benchmark_batch.py [--faqs faqs.json] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ENGINES = ('python', 'sparse')
+
+# Code run in the fresh interpreter, prints the engine, timing and matches as JSON
+PROBE = """
+import io, json, sys, time
+import app
+client = app.app.test_client()
+with open(sys.argv[1], 'rb') as f:
+    client.post('/upload', data={'file': (io.BytesIO(f.read()), 'faqs.json')})
+messages = json.loads(sys.argv[2])
+start = time.perf_counter()
+response = client.post('/chat/batch', json={'messages': messages, 'top_k': 3})
+elapsed = time.perf_counter() - start
+results = response.get_json()['results']
+print(json.dumps({
+    'engine': app.chatbot.engine_name,
+    'batch_ms': elapsed * 1000,
+    'matches': [[(match['id'], round(match['score'], 6)) for match in result['matches']] for result in results]
+}))
+"""
+
+
+def make_messages(faq_data, repeat):
+    """Questions of the FAQ file, lowercased and cut short, plus unrelated text."""
+    messages = []
+    for item in faq_data:
+        question = item['question']
+        messages += [question, question.lower().rstrip('?'), ' '.join(question.split()[:3])]
+    messages += ['completely unrelated words', '']
+    return messages * repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--faqs', default='faqs.json', help='FAQ file uploaded to the app')
+    parser.add_argument('--repeat', type=int, default=50, help='Copies of the messages in the batch')
+    args = parser.parse_args()
+
+    with open(args.faqs, encoding='utf-8') as f:
+        messages = make_messages(json.load(f), args.repeat)
+
+    outputs = {}
+    with tempfile.TemporaryDirectory(prefix='faq_index_') as index_folder:
+        for engine in ENGINES:
+            env = dict(os.environ, FAQ_ENGINE=engine, INDEX_FOLDER=index_folder, NLTK_OFFLINE='1')
+            result = subprocess.run(
+                [sys.executable, '-c', PROBE, os.path.abspath(args.faqs), json.dumps(messages)],
+                env=env, capture_output=True, text=True, check=True
+            )
+            outputs[engine] = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{engine:8} {len(messages)} messages in {outputs[engine]['batch_ms']:8.1f} ms")
+
+    failed = False
+    for engine, output in outputs.items():
+        if output['engine'] != engine:
+            print(f"FAQ_ENGINE={engine} served by the {output['engine']} engine")
+            failed = True
+
+    expected = outputs[ENGINES[0]]['matches']
+    for engine in ENGINES[1:]:
+        differing = sum(1 for a, b in zip(expected, outputs[engine]['matches']) if a != b)
+        if differing:
+            print(f"{engine} matches differ from {ENGINES[0]} on {differing} messages")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
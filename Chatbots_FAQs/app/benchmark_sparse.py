@@ -0,0 +1,90 @@
+"""
+Check that the sparse scoring engine stays within its memory budget.
+
+Scores a batch of synthetic queries against a synthetic FAQ corpus, reducing
+every chunk of scores to its top k like FAQChatbot.find_top_matches_batch,
+and checks the peak of the traced allocations against the budget plus a
+small fixed slack. Also checks the budgeted scores against a run with budget
+and chunk size large enough to score the sampled queries in one chunk.
+
+Usage: python benchmark_sparse.py [--faqs 20000] [--queries 2000] [--budget-mb 64]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from sparse_engine import SparseScoringEngine
+
+# Allocations outside the budgeted arrays the peak may include
+SLACK = 8 * 1024 * 1024
+
+
+def make_corpus(faqs, queries, vocabulary_size, seed=0):
+    """
+    Random token lists, query tokens are partly outside the FAQ vocabulary.
+
+    :return: Tuple of (FAQ token lists, query token lists)
+    """
+    rng = random.Random(seed)
+
+    def word():
+        return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+
+    vocabulary = [word() for _ in range(vocabulary_size)]
+    faq_tokens = [rng.sample(vocabulary, rng.randint(3, 12)) for _ in range(faqs)]
+    query_tokens = [
+        [rng.choice(vocabulary) if rng.random() < 0.7 else word() for _ in range(rng.randint(2, 10))]
+        for _ in range(queries)
+    ]
+    return faq_tokens, query_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--faqs', type=int, default=20000, help='FAQ questions in the corpus')
+    parser.add_argument('--queries', type=int, default=2000, help='Queries in the batch')
+    parser.add_argument('--vocabulary', type=int, default=20000, help='Distinct FAQ tokens to draw from')
+    parser.add_argument('--budget-mb', type=float, default=64, help='Memory budget of the engine')
+    parser.add_argument('--top-k', type=int, default=5, help='Matches kept per query')
+    args = parser.parse_args()
+
+    faq_tokens, query_tokens = make_corpus(args.faqs, args.queries, args.vocabulary)
+    budget = int(args.budget_mb * 1024 * 1024)
+    engine = SparseScoringEngine(faq_tokens, memory_budget=budget)
+    print(f"{args.faqs} FAQs, {engine.incidence.shape[1]} tokens, {engine.incidence.nnz} nonzeros; "
+          f"{engine.query_chunk} queries per chunk, {engine.token_block} query tokens per block")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    best = {}
+    for position, chunk_scores in engine.iter_score_chunks(query_tokens):
+        for offset, row in enumerate(chunk_scores):
+            best[position + offset] = engine.top_k(row, args.top_k)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"Scored {args.queries} queries in {elapsed:.2f} s, {args.queries / elapsed:.0f} queries/s")
+    print(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB (budget {args.budget_mb:.0f} MiB)")
+
+    # Same scores as one unbounded chunk, on a sample small enough to afford it
+    sample = query_tokens[:20]
+    unbounded = SparseScoringEngine(faq_tokens, chunk_size=len(sample), memory_budget=1 << 40)
+    expected = unbounded.score_batch(sample)
+    actual = engine.score_batch(sample)
+    if not np.allclose(actual, expected):
+        sys.exit("Budgeted scores differ from the unbounded engine")
+
+    # The budget covers the working arrays; the slack covers the chunk's token lists and small vectors
+    if peak > budget + SLACK:
+        sys.exit(f"Peak memory {peak / 1024 / 1024:.1f} MiB is over the budget "
+                 f"plus {SLACK / 1024 / 1024:.0f} MiB")
+
+
+if __name__ == '__main__':
+    main()
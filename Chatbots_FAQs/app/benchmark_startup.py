@@ -0,0 +1,73 @@
+"""
+Measure chatbot import time and cold start against a budget.
+
+Each measurement runs in a fresh interpreter, like a newly started worker:
+the import of chat.py, then building a FAQChatbot from the FAQ file and
+answering a first message. Exits with status 1 when a budget is exceeded.
+
+Usage: python benchmark_startup.py [--faqs faqs.json] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Code run in the fresh interpreter, prints the timings in milliseconds as JSON
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import chat
+imported = time.perf_counter()
+with open(sys.argv[1], encoding='utf-8') as f:
+    chatbot = chat.FAQChatbot(json.load(f), tokenizer=sys.argv[2])
+chatbot.generate_response('How do I track my order?')
+ready = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'cold_start_ms': (ready - start) * 1000}))
+"""
+
+
+def measure(faqs, tokenizer):
+    """
+    Run the probe in a fresh interpreter without downloading NLTK data.
+
+    :param faqs: Path of the FAQ data file
+    :param tokenizer: Tokenizer backend of the chatbot
+    :return: Dictionary with import_ms and cold_start_ms
+    """
+    env = dict(os.environ, NLTK_OFFLINE='1')
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, faqs, tokenizer],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--faqs', default='faqs.json', help='FAQ data file')
+    parser.add_argument('--tokenizer', default='nltk', help='Tokenizer backend')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--import-budget-ms', type=float, default=50, help='Budget for importing chat.py')
+    parser.add_argument('--cold-start-budget-ms', type=float, default=2000, help='Budget until the first answer')
+    args = parser.parse_args()
+
+    runs = [measure(os.path.abspath(args.faqs), args.tokenizer) for _ in range(args.runs)]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    cold_start_ms = statistics.median(run['cold_start_ms'] for run in runs)
+
+    print(f"Import time: {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"Cold start:  {cold_start_ms:.1f} ms (budget {args.cold_start_budget_ms:.0f} ms)")
+
+    over_budget = import_ms > args.import_budget_ms or cold_start_ms > args.cold_start_budget_ms
+    if over_budget:
+        print("Startup budget exceeded")
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
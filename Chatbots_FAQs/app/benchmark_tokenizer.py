@@ -0,0 +1,79 @@
+"""
+Compare the NLTK and fast tokenizer backends of FAQChatbot.
+
+Checks that both backends produce the same tokens for the bundled faqs.json
+and reports the per-message preprocessing latency of each.
+
+Usage: python benchmark_tokenizer.py [--faqs faqs.json] [--rounds 200]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from chat import FAQChatbot, configure_caches
+
+
+def time_backend(chatbot, messages, rounds):
+    """
+    Measure the preprocessing latency of each message.
+
+    :param chatbot: FAQChatbot using the backend to measure
+    :param messages: List of input strings
+    :param rounds: Number of passes over the messages
+    :return: List of per-message latencies in microseconds
+    """
+    latencies = []
+    for _ in range(rounds):
+        for message in messages:
+            start = time.perf_counter()
+            chatbot.preprocess_text(message)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--faqs', default='faqs.json', help='FAQ data file')
+    parser.add_argument('--rounds', type=int, default=200, help='Passes over the messages')
+    args = parser.parse_args()
+
+    with open(args.faqs, encoding='utf-8') as f:
+        faq_data = json.load(f)
+
+    chatbots = {
+        tokenizer: FAQChatbot(faq_data, tokenizer=tokenizer)
+        for tokenizer in FAQChatbot.TOKENIZERS
+    }
+    messages = [faq['question'] for faq in faq_data] + [faq['answer'] for faq in faq_data]
+
+    # Parity of the token output on the bundled data
+    mismatches = [
+        message for message in messages
+        if chatbots['nltk'].preprocess_text(message) != chatbots['fast'].preprocess_text(message)
+    ]
+    for message in mismatches:
+        print(f"Token mismatch: {message!r}")
+        print(f"  nltk: {chatbots['nltk'].preprocess_text(message)}")
+        print(f"  fast: {chatbots['fast'].preprocess_text(message)}")
+    print(f"Token parity: {len(messages) - len(mismatches)}/{len(messages)} messages match")
+
+    # Time the tokenizers themselves, not the text cache
+    configure_caches(text_cache_size=0)
+
+    medians = {}
+    for tokenizer, chatbot in chatbots.items():
+        latencies = time_backend(chatbot, messages, args.rounds)
+        medians[tokenizer] = statistics.median(latencies)
+        print(
+            f"{tokenizer:>5}: median {medians[tokenizer]:.1f} us, "
+            f"mean {statistics.mean(latencies):.1f} us per message"
+        )
+
+    print(f"Speedup of the fast path: {medians['nltk'] / medians['fast']:.1f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,659 @@
-import nltk
+import os
 import re
+import sys
+import json
+import mmap
+import heapq
+import bisect
 import random
-import numpy as np
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import struct
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+# NLTK data used by the chatbot, by package name. NLTK itself and its data are
+# only loaded on first use, so importing this module stays cheap.
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+}
+
+# Set NLTK_OFFLINE=1 to only use local NLTK data and never hit the network
+NLTK_OFFLINE = os.getenv('NLTK_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+_nltk_lock = threading.Lock()
+_stop_words = None
+_lemmatizer = None
+_word_tokenize = None
+
+
+def ensure_nltk_resources(packages=None, download=None):
+    """
+    Check that NLTK data is available locally, downloading what is missing.
+    
+    :param packages: Package names from NLTK_RESOURCES, defaults to all of them
+    :param download: Download missing packages, defaults to not NLTK_OFFLINE
+    :return: List of packages that are still missing
+    """
+    import nltk
+    
+    if download is None:
+        download = not NLTK_OFFLINE
+    
+    missing = []
+    for package in packages or NLTK_RESOURCES:
+        try:
+            nltk.data.find(NLTK_RESOURCES[package])
+        except LookupError:
+            if not (download and nltk.download(package, quiet=True)):
+                missing.append(package)
+    return missing
+
+
+def get_stop_words():
+    """
+    Load the English stopwords once per process.
+    
+    :return: Frozen set of stopwords
+    """
+    global _stop_words
+    if _stop_words is None:
+        with _nltk_lock:
+            if _stop_words is None:
+                ensure_nltk_resources(['stopwords'])
+                from nltk.corpus import stopwords
+                _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def get_lemmatizer():
+    """
+    Create the WordNet lemmatizer once per process.
+    
+    :return: Shared WordNetLemmatizer
+    """
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _nltk_lock:
+            if _lemmatizer is None:
+                ensure_nltk_resources(['wordnet'])
+                from nltk.stem import WordNetLemmatizer
+                _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer
+
+
+def get_word_tokenize():
+    """
+    Import NLTK's word_tokenize once per process.
+    
+    :return: The word_tokenize function
+    """
+    global _word_tokenize
+    if _word_tokenize is None:
+        with _nltk_lock:
+            if _word_tokenize is None:
+                ensure_nltk_resources(['punkt', 'punkt_tab'])
+                from nltk.tokenize import word_tokenize
+                _word_tokenize = word_tokenize
+    return _word_tokenize
+
+# Bit assigned to each character seen so far, shared by all chatbots
+_char_bits = {}
+_char_bits_lock = threading.Lock()
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(value):
+        return bin(value).count('1')
+
+
+def char_mask(token):
+    """
+    Encode the character set of a token as an integer bitmask.
+    
+    :param token: Token string
+    :return: Integer with one bit set per distinct character
+    """
+    mask = 0
+    for char in token:
+        bit = _char_bits.get(char)
+        if bit is None:
+            with _char_bits_lock:
+                bit = _char_bits.setdefault(char, 1 << len(_char_bits))
+        mask |= bit
+    return mask
+
+
+class OverlapMemo:
+    def __init__(self, max_pairs=500000):
+        """
+        Per-process memo of token-pair overlap scores with LRU eviction.
+        
+        Scores are grouped in one row per query token; the least recently
+        used rows are evicted once more than max_pairs scores are stored.
+        
+        :param max_pairs: Maximum number of memoized token pairs
+        """
+        self.max_pairs = max_pairs
+        self._rows = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def row(self, token):
+        """
+        Get the overlap scores memoized for a query token.
+        
+        :param token: Query token
+        :return: Dictionary mapping FAQ tokens to overlap scores
+        """
+        with self._lock:
+            row = self._rows.get(token)
+            if row is None:
+                row = self._rows[token] = {}
+            else:
+                self._rows.move_to_end(token)
+            return row
+    
+    def grow(self, count):
+        """
+        Account for newly memoized scores and evict the oldest rows if needed.
+        
+        :param count: Number of scores added since the last call
+        """
+        with self._lock:
+            self._size += count
+            while self._size > self.max_pairs and len(self._rows) > 1:
+                _, row = self._rows.popitem(last=False)
+                self._size -= len(row)
+
+
+overlap_memo = OverlapMemo()
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        """
+        Thread-safe bounded mapping with least-recently-used eviction.
+        
+        :param maxsize: Maximum number of entries, 0 disables the cache
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """
+        Look up a key and mark it as recently used.
+        
+        :param key: Cache key
+        :return: Cached value or None
+        """
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if needed.
+        
+        :param key: Cache key
+        :param value: Value to cache, must not be None
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+    
+    def resize(self, maxsize):
+        """
+        Change the maximum number of entries.
+        
+        :param maxsize: New maximum number of entries
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+    
+    def _evict(self):
+        """Drop the least recently used entries above maxsize."""
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def stats(self):
+        """
+        Report the cache size and hit/miss counters.
+        
+        :return: Dictionary of cache statistics
+        """
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Preprocessing caches, shared by all chatbots since they don't depend on the FAQ set
+text_cache = LRUCache(4096)
+lemma_cache = LRUCache(65536)
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def configure_caches(text_cache_size=None, lemma_cache_size=None):
+    """
+    Resize the shared preprocessing caches.
+    
+    :param text_cache_size: Maximum number of cached normalized texts
+    :param lemma_cache_size: Maximum number of cached lemmas
+    """
+    if text_cache_size is not None:
+        text_cache.resize(text_cache_size)
+    if lemma_cache_size is not None:
+        lemma_cache.resize(lemma_cache_size)
+
+
+def get_cache_stats():
+    """
+    Collect statistics of the shared preprocessing caches.
+    
+    :return: Dictionary of statistics per cache
+    """
+    return {
+        'text_cache': text_cache.stats(),
+        'lemma_cache': lemma_cache.stats()
+    }
+
+
+# Index snapshots start with the magic, format version and header length,
+# followed by a JSON header and 8-byte aligned arrays in native byte order
+SNAPSHOT_MAGIC = b'FAQIDX'
+SNAPSHOT_VERSION = 3
+_SNAPSHOT_PREFIX = struct.Struct('<6sHI')
+
+
+def _align(offset, alignment=8):
+    """Round an offset up to the next multiple of alignment."""
+    return -(-offset // alignment) * alignment
+
+
+class FAQIndex:
+    def __init__(self, faqs, inverted_index, ids, next_seq, engine=None):
+        """
+        Preprocessed FAQ entries with their lookup structures.
+        
+        An index is never modified once built: updates create a new index
+        and swap it in with a single assignment, so concurrent readers
+        always see a complete one.
+        
+        :param faqs: Preprocessed FAQ entries in ranking order
+        :param inverted_index: Mapping of lemma to ascending entry sequence numbers
+        :param ids: Mapping of FAQ id to entry sequence number
+        :param next_seq: Sequence number of the next added entry
+        :param engine: Sparse scoring engine over faqs, or None
+        """
+        self.faqs = faqs
+        self.entries = {faq['seq']: faq for faq in faqs}
+        self.inverted_index = inverted_index
+        self.ids = ids
+        self.next_seq = next_seq
+        self.engine = engine
 
-# Download necessary NLTK resources
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('wordnet', quiet=True)
 
 class FAQChatbot:
-    def __init__(self, faq_data):
+    # Weights of the two terms combined by calculate_similarity
+    JACCARD_WEIGHT = 0.6
+    PARTIAL_WEIGHT = 0.4
+    
+    # Available scoring engines, 'sparse' requires scipy
+    ENGINES = ('python', 'sparse')
+    
+    # Available tokenizers, 'fast' splits on whitespace instead of calling NLTK
+    TOKENIZERS = ('nltk', 'fast')
+    
+    # Fallback responses if no match found
+    FALLBACK_RESPONSES = (
+        "I'm sorry, I couldn't find a specific answer to your question.",
+        "Could you please rephrase your question?",
+        "I don't have enough information to answer that. Can you be more specific?",
+        "I'm afraid I don't understand. Could you try asking differently?"
+    )
+    
+    def __init__(self, faq_data, engine='python', tokenizer='nltk'):
         """
         Initialize the chatbot with FAQ data.
         
         :param faq_data: List of dictionaries with 'question' and 'answer' keys
+        :param engine: Scoring engine, one of ENGINES
+        :param tokenizer: Tokenizer backend, one of TOKENIZERS
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown scoring engine '{engine}', expected one of {self.ENGINES}")
+        if tokenizer not in self.TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer '{tokenizer}', expected one of {self.TOKENIZERS}")
+        
+        self.tokenizer = tokenizer
+        self.engine_name = engine
+        
+        # Serializes index updates, readers never take it
+        self._write_lock = threading.Lock()
+        
         # Validate and normalize input data
-        self.faq_data = self._validate_and_normalize_data(faq_data)
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
+        faq_data = self._validate_and_normalize_data(faq_data)
         
         # Preprocess questions for faster matching
-        self.processed_faqs = self.preprocess_faq_data()
+        self._index = self._build_index(self.preprocess_faq_data(faq_data))
+    
+    @property
+    def processed_faqs(self):
+        """Preprocessed FAQ entries of the current index."""
+        return self._index.faqs
+    
+    @property
+    def inverted_index(self):
+        """Lemma to entry sequence numbers mapping of the current index."""
+        return self._index.inverted_index
+    
+    @property
+    def engine(self):
+        """Sparse scoring engine of the current index, None for the Python path."""
+        return self._index.engine
+    
+    @property
+    def faq_data(self):
+        """Normalized FAQ items of the current index."""
+        return [self._faq_item(faq) for faq in self._index.faqs]
+    
+    @property
+    def content_hash(self):
+        """Hash of the current FAQ data, keying index snapshots."""
+        return self._hash_content(self.faq_data, self.tokenizer)
     
-    def _validate_and_normalize_data(self, data):
+    @property
+    def stop_words(self):
+        """Stopwords shared by all chatbots of the process."""
+        return get_stop_words()
+    
+    @property
+    def lemmatizer(self):
+        """Lemmatizer shared by all chatbots of the process."""
+        return get_lemmatizer()
+    
+    @classmethod
+    def load_or_build(cls, faq_data, index_dir, engine='python', tokenizer='nltk'):
+        """
+        Load the index snapshot of the FAQ data, building and saving it if needed.
+        
+        Snapshots are stored in index_dir and named after the content hash.
+        
+        :param faq_data: List of dictionaries with 'question' and 'answer' keys
+        :param index_dir: Directory holding index snapshots
+        :param engine: Scoring engine, one of ENGINES
+        :param tokenizer: Tokenizer backend, one of TOKENIZERS
+        :return: FAQChatbot instance
+        """
+        path = cls.snapshot_path(faq_data, index_dir, tokenizer)
+        content_hash = os.path.splitext(os.path.basename(path))[0]
+        
+        if os.path.exists(path):
+            try:
+                return cls.load_index(path, engine=engine, content_hash=content_hash)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Rebuilding index snapshot {path}: {str(e)}")
+        
+        chatbot = cls(faq_data, engine=engine, tokenizer=tokenizer)
+        try:
+            chatbot.save_index(path)
+        except OSError as e:
+            print(f"Warning: Could not save index snapshot {path}: {str(e)}")
+        return chatbot
+    
+    @classmethod
+    def snapshot_path(cls, faq_data, index_dir, tokenizer='nltk'):
+        """
+        Get the path of the index snapshot of the FAQ data.
+        
+        :param faq_data: List of dictionaries with 'question' and 'answer' keys
+        :param index_dir: Directory holding index snapshots
+        :param tokenizer: Tokenizer backend, one of TOKENIZERS
+        :return: Snapshot file path, named after the content hash
+        """
+        content_hash = cls._hash_content(cls._validate_and_normalize_data(faq_data), tokenizer)
+        return os.path.join(index_dir, f"{content_hash}.faqidx")
+
+    @staticmethod
+    def prune_snapshots(index_dir, keep):
+        """
+        Delete the index snapshots of index_dir other than the given ones.
+
+        Uploads name every snapshot after its content, so superseded ones
+        would pile up. Processes that still map a deleted snapshot keep
+        reading it until they unmap it; files that can't be removed (e.g.
+        mapped on Windows) are left for a later prune.
+
+        :param index_dir: Directory holding index snapshots
+        :param keep: Snapshot paths to keep
+        :return: Number of snapshots deleted
+        """
+        keep = {os.path.abspath(path) for path in keep}
+        removed = 0
+        try:
+            names = os.listdir(index_dir)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.abspath(os.path.join(index_dir, name))
+            if not name.endswith('.faqidx') or path in keep:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"Warning: Could not remove index snapshot {path}: {str(e)}")
+        return removed
+
+    @classmethod
+    def load_index(cls, path, engine='python', content_hash=None):
+        """
+        Load a chatbot from an index snapshot without any NLTK work.
+        
+        The file stays memory-mapped: the posting lists and the sparse
+        engine matrices are read-only views of the mapping, so workers
+        loading the same snapshot share those pages through the page cache.
+        The per-entry token sets are still built in each process.
+        
+        :param path: Snapshot file written by save_index
+        :param engine: Scoring engine, one of ENGINES
+        :param content_hash: Expected content hash, checked when given
+        :return: FAQChatbot instance
+        """
+        if engine not in cls.ENGINES:
+            raise ValueError(f"Unknown scoring engine '{engine}', expected one of {cls.ENGINES}")
+        
+        with open(path, 'rb') as f:
+            snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        try:
+            header, data_start = cls._read_snapshot_header(snapshot, content_hash)
+        except Exception:
+            snapshot.close()
+            raise
+        
+        # Views keep the mapping open for as long as the index uses them
+        view = memoryview(snapshot)
+        arrays = {}
+        for name, (typecode, offset, count) in header['arrays'].items():
+            start = data_start + offset
+            arrays[name] = view[start:start + count * array(typecode).itemsize].cast(typecode)
+        
+        chatbot = cls.__new__(cls)
+        chatbot.tokenizer = header['tokenizer']
+        chatbot.engine_name = engine
+        chatbot._write_lock = threading.Lock()
+        
+        # Rebuild the processed questions from vocabulary positions
+        vocabulary = header['vocabulary']
+        indptr = arrays['token_indptr']
+        indices = arrays['token_indices']
+        entries = [
+            chatbot._make_entry(faq, [vocabulary[i] for i in indices[indptr[seq]:indptr[seq + 1]]], seq)
+            for seq, faq in enumerate(header['faq_data'])
+        ]
+        
+        # Posting lists are slices of the mapped postings, in vocabulary order
+        posting_indptr = arrays['posting_indptr']
+        postings = arrays['posting_indices']
+        inverted_index = {
+            token: postings[posting_indptr[position]:posting_indptr[position + 1]]
+            for position, token in enumerate(vocabulary)
+        }
+        
+        sparse_engine = None
+        if engine == 'sparse':
+            from sparse_engine import SparseScoringEngine
+            sparse_engine = SparseScoringEngine.from_arrays(
+                vocabulary, header['alphabet'], arrays,
+                cls.JACCARD_WEIGHT, cls.PARTIAL_WEIGHT
+            )
+        
+        chatbot._index = chatbot._build_index(entries, inverted_index, sparse_engine)
+        return chatbot
+    
+    @staticmethod
+    def _read_snapshot_header(snapshot, content_hash=None):
+        """
+        Validate a mapped snapshot and parse its JSON header.
+        
+        :param snapshot: Memory-mapped snapshot file
+        :param content_hash: Expected content hash, checked when given
+        :return: Tuple of (header, offset of the first array)
+        """
+        if len(snapshot) < _SNAPSHOT_PREFIX.size:
+            raise ValueError("Truncated index snapshot")
+        
+        magic, version, header_length = _SNAPSHOT_PREFIX.unpack_from(snapshot, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a FAQ index snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported index snapshot version {version}")
+        
+        header_end = _SNAPSHOT_PREFIX.size + header_length
+        header = json.loads(snapshot[_SNAPSHOT_PREFIX.size:header_end].decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError("Index snapshot was written with another byte order")
+        if content_hash is not None and header['content_hash'] != content_hash:
+            raise ValueError("Index snapshot does not match the FAQ data")
+        
+        data_start = _align(header_end)
+        for typecode, offset, count in header['arrays'].values():
+            if data_start + offset + count * array(typecode).itemsize > len(snapshot):
+                raise ValueError("Truncated index snapshot")
+        return header, data_start
+    
+    def save_index(self, path):
+        """
+        Save the preprocessed index to a versioned snapshot file.
+        
+        Besides the processed questions, the snapshot holds the posting
+        lists and the sparse engine features, so loading rebuilds neither.
+        The file is written next to its final path and renamed into place,
+        so readers never see a partial snapshot.
+        
+        :param path: Destination file
+        """
+        from sparse_engine import feature_arrays
+        
+        index = self._index
+        
+        # Processed questions as positions in a shared vocabulary
+        vocabulary = {}
+        indptr = array('q', [0])
+        indices = array('i')
+        for faq in index.faqs:
+            for token in faq['processed_question']:
+                indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            indptr.append(len(indices))
+        
+        # Posting list of every vocabulary token, as entry positions: loading
+        # renumbers the entries, which closes gaps left by deletes
+        positions = {faq['seq']: position for position, faq in enumerate(index.faqs)}
+        posting_indptr = array('q', [0])
+        posting_indices = array('q')
+        for token in vocabulary:
+            posting_indices.extend(positions[seq] for seq in index.inverted_index.get(token, ()))
+            posting_indptr.append(len(posting_indices))
+        
+        alphabet, engine_arrays = feature_arrays(
+            [faq['processed_question'] for faq in index.faqs], vocabulary
+        )
+        
+        arrays = {
+            'token_indptr': indptr,
+            'token_indices': indices,
+            'posting_indptr': posting_indptr,
+            'posting_indices': posting_indices,
+            **engine_arrays
+        }
+        
+        faq_data = [self._faq_item(faq) for faq in index.faqs]
+        header = {
+            'content_hash': self._hash_content(faq_data, self.tokenizer),
+            'tokenizer': self.tokenizer,
+            'byteorder': sys.byteorder,
+            'faq_data': faq_data,
+            'vocabulary': list(vocabulary),
+            'alphabet': alphabet,
+            'arrays': {}
+        }
+        offset = 0
+        for name, values in arrays.items():
+            header['arrays'][name] = [values.typecode, offset, len(values)]
+            offset = _align(offset + len(values) * values.itemsize)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            for values in arrays.values():
+                f.write(values.tobytes())
+                f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        os.replace(temp_path, path)
+    
+    @staticmethod
+    def _hash_content(faq_data, tokenizer):
+        """
+        Hash normalized FAQ data together with what else shapes the index.
+        
+        :param faq_data: Normalized FAQ data
+        :param tokenizer: Tokenizer backend
+        :return: Hex digest keying the index snapshot
+        """
+        content = json.dumps(
+            {'version': SNAPSHOT_VERSION, 'tokenizer': tokenizer, 'faq_data': faq_data},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _validate_and_normalize_data(data):
         """
         Validate and normalize the input FAQ data.
         
@@ -36,27 +663,59 @@ class FAQChatbot:
         if not isinstance(data, list):
             raise ValueError("FAQ data must be a list of dictionaries")
         
-        normalized_data = []
-        for item in data:
-            if not isinstance(item, dict):
-                raise ValueError("Each FAQ item must be a dictionary")
-            
-            if 'question' not in item or 'answer' not in item:
-                raise ValueError("Each FAQ item must contain 'question' and 'answer' keys")
-            
-            if not isinstance(item['question'], str) or not isinstance(item['answer'], str):
-                raise ValueError("Question and answer must be strings")
-            
-            if not item['question'].strip() or not item['answer'].strip():
-                raise ValueError("Question and answer cannot be empty")
-            
-            normalized_data.append({
-                'question': item['question'].strip(),
-                'answer': item['answer'].strip()
-            })
+        normalized_data = [FAQChatbot._normalize_item(item) for item in data]
+        
+        ids = [item['id'] for item in normalized_data if 'id' in item]
+        if len(ids) != len(set(ids)):
+            raise ValueError("FAQ ids must be unique")
         
         return normalized_data
     
+    @staticmethod
+    def _normalize_item(item):
+        """
+        Validate and normalize a single FAQ item.
+        
+        :param item: Dictionary with 'question', 'answer' and optional 'id' keys
+        :return: Normalized FAQ item
+        """
+        if not isinstance(item, dict):
+            raise ValueError("Each FAQ item must be a dictionary")
+        
+        if 'question' not in item or 'answer' not in item:
+            raise ValueError("Each FAQ item must contain 'question' and 'answer' keys")
+        
+        if not isinstance(item['question'], str) or not isinstance(item['answer'], str):
+            raise ValueError("Question and answer must be strings")
+        
+        if not item['question'].strip() or not item['answer'].strip():
+            raise ValueError("Question and answer cannot be empty")
+        
+        normalized_item = {}
+        if item.get('id') is not None:
+            if isinstance(item['id'], bool) or not isinstance(item['id'], (int, str)):
+                raise ValueError("FAQ id must be an integer or a string")
+            normalized_item['id'] = item['id']
+        
+        normalized_item['question'] = item['question'].strip()
+        normalized_item['answer'] = item['answer'].strip()
+        return normalized_item
+    
+    @staticmethod
+    def _faq_item(faq):
+        """
+        Convert a preprocessed FAQ entry back to a normalized FAQ item.
+        
+        :param faq: Preprocessed FAQ entry
+        :return: Normalized FAQ item
+        """
+        item = {}
+        if faq['id'] is not None:
+            item['id'] = faq['id']
+        item['question'] = faq['original_question']
+        item['answer'] = faq['answer']
+        return item
+    
     def preprocess_text(self, text):
         """
         Preprocess input text for comparison.
@@ -69,46 +728,259 @@ class FAQChatbot:
             text = str(text).lower()
             
             # Remove punctuation
-            text = re.sub(r'[^\w\s]', '', text)
+            text = _PUNCTUATION.sub('', text)
+            
+            cached = text_cache.get((self.tokenizer, text))
+            if cached is not None:
+                return list(cached)
             
-            # Tokenize
-            tokens = word_tokenize(text)
+            # Tokenize, punctuation is already gone so splitting on whitespace is enough
+            if self.tokenizer == 'fast':
+                tokens = text.split()
+            else:
+                tokens = get_word_tokenize()(text)
             
             # Remove stop words and lemmatize
+            stop_words = self.stop_words
             processed_tokens = [
-                self.lemmatizer.lemmatize(token) 
+                self.lemmatize(token) 
                 for token in tokens 
-                if token not in self.stop_words
+                if token not in stop_words
             ]
             
+            text_cache.put((self.tokenizer, text), tuple(processed_tokens))
             return processed_tokens
         except Exception as e:
             raise ValueError(f"Error preprocessing text: {str(e)}")
     
-    def preprocess_faq_data(self):
+    def lemmatize(self, token):
+        """
+        Lemmatize a token through the shared lemma cache.
+        
+        :param token: Lowercase token
+        :return: Lemma of the token
+        """
+        lemma = lemma_cache.get(token)
+        if lemma is None:
+            lemma = self.lemmatizer.lemmatize(token)
+            lemma_cache.put(token, lemma)
+        return lemma
+    
+    def preprocess_faq_data(self, faq_data):
         """
         Preprocess all FAQ questions for faster matching.
         
+        :param faq_data: Normalized FAQ data
         :return: List of preprocessed FAQ entries
         """
         processed_faqs = []
-        for faq in self.faq_data:
+        for seq, faq in enumerate(faq_data):
             try:
                 # Assign the processed tokens to a variable
                 processed_question = self.preprocess_text(faq['question'])
-                processed_faqs.append({
-                    'original_question': faq['question'],
-                    'processed_question': processed_question,  
-                    'answer': faq['answer']
-                })
+                processed_faqs.append(self._make_entry(faq, processed_question, seq))
             except Exception as e:
                 print(f"Warning: Skipping invalid FAQ entry: {str(e)}")
                 continue
         
+        return processed_faqs
+    
+    def _make_entry(self, faq, processed_question, seq):
+        """
+        Build the preprocessed entry of a FAQ item.
+        
+        :param faq: Normalized FAQ item
+        :param processed_question: Preprocessed question tokens
+        :param seq: Sequence number, entries rank in ascending seq order on ties
+        :return: Preprocessed FAQ entry
+        """
+        token_set = frozenset(processed_question)
+        return {
+            'id': faq.get('id'),
+            'seq': seq,
+            'original_question': faq['question'],
+            'processed_question': processed_question,  
+            'answer': faq['answer'],
+            'token_set': token_set,
+            # Character set of each distinct token for partial matches
+            'char_features': tuple(
+                (token, char_mask(token), len(token)) for token in token_set
+            )
+        }
+    
+    def _build_index(self, processed_faqs, inverted_index=None, engine=None):
+        """
+        Build the index of the preprocessed FAQ entries.
+        
+        The inverted index maps each lemma to the sequence numbers of the
+        entries whose question contains it.
+        
+        :param processed_faqs: Preprocessed FAQ entries in ascending seq order
+        :param inverted_index: Prebuilt inverted index, e.g. from a snapshot, or None
+        :param engine: Prebuilt scoring engine, or None to create it
+        :return: FAQIndex
+        """
         if not processed_faqs:
             raise ValueError("No valid FAQ entries were processed")
         
-        return processed_faqs
+        if inverted_index is None:
+            inverted_index = {}
+            for faq in processed_faqs:
+                # Register the entry in the posting list of each distinct lemma
+                for token in faq['token_set']:
+                    inverted_index.setdefault(token, []).append(faq['seq'])
+        
+        ids = {faq['id']: faq['seq'] for faq in processed_faqs if faq['id'] is not None}
+        
+        return FAQIndex(
+            processed_faqs,
+            inverted_index,
+            ids,
+            processed_faqs[-1]['seq'] + 1,
+            engine if engine is not None else self._create_engine(processed_faqs)
+        )
+    
+    def _create_engine(self, processed_faqs):
+        """
+        Set up the scoring engine over the preprocessed FAQs.
+        
+        :param processed_faqs: Preprocessed FAQ entries in ranking order
+        :return: SparseScoringEngine, or None for the pure Python path
+        """
+        if self.engine_name == 'sparse':
+            from sparse_engine import SparseScoringEngine
+            return SparseScoringEngine(
+                [faq['processed_question'] for faq in processed_faqs],
+                self.JACCARD_WEIGHT,
+                self.PARTIAL_WEIGHT
+            )
+        return None
+    
+    def add_faq(self, item):
+        """
+        Add a FAQ entry, only indexing the new question.
+        
+        Items without an id get the next free integer id.
+        
+        :param item: Dictionary with 'question', 'answer' and optional 'id' keys
+        :return: Normalized FAQ item
+        """
+        item = self._normalize_item(item)
+        processed_question = self.preprocess_text(item['question'])
+        
+        with self._write_lock:
+            index = self._index
+            if 'id' not in item:
+                int_ids = [faq_id for faq_id in index.ids if isinstance(faq_id, int)]
+                item = {'id': max(int_ids, default=0) + 1, **item}
+            elif item['id'] in index.ids:
+                raise ValueError(f"FAQ id {item['id']!r} already exists")
+            
+            entry = self._make_entry(item, processed_question, index.next_seq)
+            self._index = self._updated_index(index, added=entry)
+        
+        return item
+    
+    def update_faq(self, faq_id, item):
+        """
+        Replace the FAQ entry with the given id, keeping its ranking order.
+        
+        :param faq_id: Id of the FAQ entry
+        :param item: Dictionary with 'question' and 'answer' keys
+        :return: Normalized FAQ item
+        """
+        item = self._normalize_item(item)
+        if item.get('id', faq_id) != faq_id:
+            raise ValueError("FAQ id cannot be changed")
+        item = {'id': faq_id, **item}
+        processed_question = self.preprocess_text(item['question'])
+        
+        with self._write_lock:
+            index = self._index
+            if faq_id not in index.ids:
+                raise KeyError(f"No FAQ with id {faq_id!r}")
+            
+            removed = index.entries[index.ids[faq_id]]
+            entry = self._make_entry(item, processed_question, removed['seq'])
+            self._index = self._updated_index(index, removed=removed, added=entry)
+        
+        return item
+    
+    def delete_faq(self, faq_id):
+        """
+        Delete the FAQ entry with the given id.
+        
+        :param faq_id: Id of the FAQ entry
+        """
+        with self._write_lock:
+            index = self._index
+            if faq_id not in index.ids:
+                raise KeyError(f"No FAQ with id {faq_id!r}")
+            if len(index.faqs) == 1:
+                raise ValueError("Cannot delete the last FAQ entry")
+            
+            removed = index.entries[index.ids[faq_id]]
+            self._index = self._updated_index(index, removed=removed)
+    
+    def _updated_index(self, index, removed=None, added=None):
+        """
+        Build a new index with one entry removed, added or replaced.
+        
+        Only the posting lists of the affected lemmas are rebuilt, the others
+        are shared with the current index. The sparse engine keeps its built
+        matrices and scores changed entries with a small delta engine; it is
+        only rebuilt once SparseScoringEngine.needs_rebuild says enough rows
+        changed, so the rebuild cost is spread over many updates.
+        
+        :param index: Current FAQIndex, left untouched
+        :param removed: Entry to remove, or None
+        :param added: Entry to add, or None; replaces removed when both are given
+        :return: New FAQIndex
+        """
+        engine = index.engine
+        if removed is not None:
+            position = next(i for i, faq in enumerate(index.faqs) if faq is removed)
+        
+        if removed is not None and added is not None:
+            faqs = index.faqs[:position] + [added] + index.faqs[position + 1:]
+            if engine is not None:
+                engine = engine.with_replaced(position, added['processed_question'])
+        elif removed is not None:
+            faqs = index.faqs[:position] + index.faqs[position + 1:]
+            if engine is not None:
+                engine = engine.with_deleted(position)
+        else:
+            faqs = index.faqs + [added]
+            if engine is not None:
+                engine = engine.with_appended(added['processed_question'])
+        
+        if engine is not None and engine.needs_rebuild():
+            engine = self._create_engine(faqs)
+        
+        inverted_index = dict(index.inverted_index)
+        ids = dict(index.ids)
+        next_seq = index.next_seq
+        
+        if removed is not None:
+            for token in removed['token_set']:
+                postings = [seq for seq in inverted_index[token] if seq != removed['seq']]
+                if postings:
+                    inverted_index[token] = postings
+                else:
+                    del inverted_index[token]
+            if removed['id'] is not None:
+                del ids[removed['id']]
+        
+        if added is not None:
+            for token in added['token_set']:
+                postings = list(inverted_index.get(token, ()))
+                bisect.insort(postings, added['seq'])
+                inverted_index[token] = postings
+            if added['id'] is not None:
+                ids[added['id']] = added['seq']
+            next_seq = max(next_seq, added['seq'] + 1)
+        
+        return FAQIndex(faqs, inverted_index, ids, next_seq, engine)
     
     def calculate_similarity(self, input_tokens, faq_tokens):
         """
@@ -141,11 +1013,183 @@ class FAQChatbot:
             ) / len(input_set) if input_set else 0
             
             # Combine both metrics
-            return (jaccard * 0.6 + partial_matches * 0.4)
+            return (jaccard * self.JACCARD_WEIGHT + partial_matches * self.PARTIAL_WEIGHT)
         except Exception as e:
             print(f"Warning: Error calculating similarity: {str(e)}")
             return 0
     
+    def get_candidates(self, input_tokens, index=None):
+        """
+        Collect the FAQ entries sharing at least one token with the input.
+        
+        :param input_tokens: Preprocessed input tokens
+        :param index: FAQIndex to search, defaults to the current one
+        :return: Candidate entries in ranking order
+        """
+        if index is None:
+            index = self._index
+        
+        candidates = set()
+        for token in set(input_tokens):
+            candidates.update(index.inverted_index.get(token, ()))
+        return [index.entries[seq] for seq in sorted(candidates)]
+    
+    def find_top_matches(self, input_text, k=1, similarity_threshold=0.3):
+        """
+        Find the k best matching FAQs for the input text.
+        
+        With the sparse engine all FAQs are scored at once. Otherwise only
+        FAQs sharing a token with the input are scored. Entries without
+        a shared token have a Jaccard similarity of 0, so their score is at
+        most PARTIAL_WEIGHT; every FAQ is scored only when a candidate does
+        not beat that bound, which keeps the result identical to scoring
+        the whole FAQ list.
+        
+        :param input_text: User input string
+        :param k: Maximum number of matches to return
+        :param similarity_threshold: Minimum similarity to consider a match
+        :return: List of (similarity, faq) tuples, best match first
+        """
+        # Preprocess input
+        processed_input = self.preprocess_text(input_text)
+        
+        # Use one index throughout, updates may swap in a new one meanwhile
+        index = self._index
+        
+        if index.engine is not None:
+            scores = index.engine.score_batch([processed_input])[0]
+            return self._engine_matches(index, scores, k, similarity_threshold)
+        
+        return self._python_matches(processed_input, index, k, similarity_threshold)
+    
+    def find_top_matches_batch(self, input_texts, k=1, similarity_threshold=0.3):
+        """
+        Find the k best matching FAQs for each of many input texts.
+        
+        Identical texts, and texts preprocessing to the same tokens, are
+        scored once; with the sparse engine all of them are scored together.
+        
+        :param input_texts: List of user input strings
+        :param k: Maximum number of matches per input
+        :param similarity_threshold: Minimum similarity to consider a match
+        :return: List of (similarity, faq) tuple lists, in input order
+        """
+        processed_inputs = {}
+        for text in map(str, input_texts):
+            if text not in processed_inputs:
+                processed_inputs[text] = tuple(self.preprocess_text(text))
+        unique_inputs = list(dict.fromkeys(processed_inputs.values()))
+        
+        index = self._index
+        
+        if index.engine is not None:
+            # Each chunk of scores is reduced to its top k before the next one is computed
+            matches = {}
+            chunks = index.engine.iter_score_chunks([list(tokens) for tokens in unique_inputs])
+            for start, chunk_scores in chunks:
+                for tokens, row in zip(unique_inputs[start:start + len(chunk_scores)], chunk_scores):
+                    matches[tokens] = self._engine_matches(index, row, k, similarity_threshold)
+        else:
+            matches = {
+                tokens: self._python_matches(list(tokens), index, k, similarity_threshold)
+                for tokens in unique_inputs
+            }
+        
+        return [matches[processed_inputs[text]] for text in map(str, input_texts)]
+    
+    @staticmethod
+    def _engine_matches(index, scores, k, similarity_threshold):
+        """
+        Select the k best matches from the sparse engine scores.
+        
+        :param index: FAQIndex the scores were computed on
+        :param scores: Scores of every entry of the index
+        :param k: Maximum number of matches to return
+        :param similarity_threshold: Minimum similarity to consider a match
+        :return: List of (similarity, faq) tuples, best match first
+        """
+        return [
+            (float(scores[i]), index.faqs[i])
+            for i in index.engine.top_k(scores, k)
+            if scores[i] >= similarity_threshold
+        ]
+    
+    def _python_matches(self, processed_input, index, k, similarity_threshold):
+        """
+        Select the k best matches, scoring inverted index candidates first.
+        
+        :param processed_input: Preprocessed input tokens
+        :param index: FAQIndex to search
+        :param k: Maximum number of matches to return
+        :param similarity_threshold: Minimum similarity to consider a match
+        :return: List of (similarity, faq) tuples, best match first
+        """
+        # Best score reachable by an FAQ that shares no token with the input
+        partial_bound = self.PARTIAL_WEIGHT if processed_input else 0
+        
+        candidates = self.get_candidates(processed_input, index)
+        top_matches = self._rank(processed_input, candidates, k)
+        
+        if len(top_matches) < k or top_matches[-1][0] <= partial_bound:
+            if similarity_threshold <= partial_bound:
+                # Partial matches alone may rank, fall back to brute force
+                top_matches = self._rank(processed_input, index.faqs, k)
+        
+        return [match for match in top_matches if match[0] >= similarity_threshold]
+    
+    def _rank(self, processed_input, faqs, k):
+        """
+        Score the given FAQ entries and keep the k best.
+        
+        heapq.nlargest is stable, so ties resolve to the earliest FAQ entry
+        exactly like a full descending sort.
+        
+        :param processed_input: Preprocessed input tokens
+        :param faqs: Preprocessed FAQ entries in ranking order
+        :param k: Number of matches to keep
+        :return: List of (similarity, faq) tuples, best match first
+        """
+        input_set = set(processed_input)
+        
+        # Character features of the input, computed once per request
+        input_features = [
+            (token, char_mask(token), len(token), overlap_memo.row(token))
+            for token in input_set
+        ]
+        
+        memoized = 0
+        scored = []
+        for faq in faqs:
+            faq_set = faq['token_set']
+            
+            # Empty token sets score 0, as in calculate_similarity
+            if not input_set or not faq_set:
+                scored.append((0, faq))
+                continue
+            
+            intersection = len(input_set.intersection(faq_set))
+            union = len(input_set) + len(faq_set) - intersection
+            jaccard = intersection / union
+            
+            partial_sum = 0
+            for token, mask, length, overlaps in input_features:
+                best = 0
+                for faq_token, faq_mask, faq_length in faq['char_features']:
+                    overlap = overlaps.get(faq_token)
+                    if overlap is None:
+                        overlap = _popcount(mask & faq_mask) / max(length, faq_length)
+                        overlaps[faq_token] = overlap
+                        memoized += 1
+                    if overlap > best:
+                        best = overlap
+                partial_sum += best
+            partial_matches = partial_sum / len(input_set)
+            
+            scored.append((jaccard * self.JACCARD_WEIGHT + partial_matches * self.PARTIAL_WEIGHT, faq))
+        
+        overlap_memo.grow(memoized)
+        return heapq.nlargest(k, scored, key=lambda x: x[0])
+    
     def find_best_match(self, input_text, similarity_threshold=0.3):
         """
         Find the best matching FAQ for the input text.
@@ -155,30 +1199,42 @@ class FAQChatbot:
         :return: Best matching FAQ or None
         """
         try:
-            # Preprocess input
-            processed_input = self.preprocess_text(input_text)
-            
-            # Calculate similarities
-            similarities = []
-            for faq in self.processed_faqs:
-                similarity = self.calculate_similarity(
-                    processed_input, 
-                    faq['processed_question']
-                )
-                similarities.append((similarity, faq))
-            
-            # Sort by similarity in descending order
-            similarities.sort(reverse=True, key=lambda x: x[0])
+            top_matches = self.find_top_matches(input_text, 1, similarity_threshold)
             
             # Return best match if above threshold
-            if similarities and similarities[0][0] >= similarity_threshold:
-                return similarities[0][1]
+            if top_matches:
+                return top_matches[0][1]
             
             return None
         except Exception as e:
             print(f"Warning: Error finding best match: {str(e)}")
             return None
     
+    def generate_responses(self, input_texts, k=3, similarity_threshold=0.3):
+        """
+        Generate responses to many input texts at once.
+        
+        :param input_texts: List of user input strings
+        :param k: Maximum number of matches reported per input
+        :param similarity_threshold: Minimum similarity to consider a match
+        :return: List of dictionaries with 'response' and 'matches' keys, in input order
+        """
+        results = []
+        for matches in self.find_top_matches_batch(input_texts, k, similarity_threshold):
+            results.append({
+                'response': matches[0][1]['answer'] if matches else random.choice(self.FALLBACK_RESPONSES),
+                'matches': [
+                    {
+                        'id': faq['id'],
+                        'question': faq['original_question'],
+                        'answer': faq['answer'],
+                        'score': score
+                    }
+                    for score, faq in matches
+                ]
+            })
+        return results
+    
     def generate_response(self, input_text):
         """
         Generate a response to the input text.
@@ -193,15 +1249,7 @@ class FAQChatbot:
             if match:
                 return match['answer']
             
-            # Fallback responses if no match found
-            fallback_responses = [
-                "I'm sorry, I couldn't find a specific answer to your question.",
-                "Could you please rephrase your question?",
-                "I don't have enough information to answer that. Can you be more specific?",
-                "I'm afraid I don't understand. Could you try asking differently?"
-            ]
-            
-            return random.choice(fallback_responses)
+            return random.choice(self.FALLBACK_RESPONSES)
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}"
 
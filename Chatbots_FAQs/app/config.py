@@ -0,0 +1,74 @@
+import os
+
+# Settings shared by the Flask app (app.py) and the ASGI server (asgi.py)
+
+# Allowed extensions of uploaded FAQ files
+ALLOWED_EXTENSIONS = {'json', 'txt'}
+
+# Limits of the /chat/batch endpoint
+MAX_BATCH_MESSAGES = 10000
+MAX_BATCH_TOP_K = 20
+
+# Preprocessed FAQ index snapshots, shared by all workers and kept across restarts
+INDEX_FOLDER = os.getenv('INDEX_FOLDER', 'index')
+
+# Tokenizer backend of the chatbot, 'nltk' or 'fast'
+TOKENIZER = os.getenv('FAQ_TOKENIZER', 'nltk')
+
+# Scoring engine of the chatbot, 'python' or 'sparse' (needs scipy)
+ENGINE = os.getenv('FAQ_ENGINE', 'python')
+
+# NLTK data needed with that tokenizer
+NLTK_PACKAGES = ['stopwords', 'wordnet'] + (['punkt', 'punkt_tab'] if TOKENIZER == 'nltk' else [])
+
+# Preprocessing cache sizes, the caches are kept across FAQ uploads
+TEXT_CACHE_SIZE = int(os.getenv('TEXT_CACHE_SIZE', 4096))
+LEMMA_CACHE_SIZE = int(os.getenv('LEMMA_CACHE_SIZE', 65536))
+
+# Default FAQ data the chatbot starts with
+default_faq_data = [
+    {
+        'question': 'Hello',
+        'answer': 'Hi, what can I assist you with?'
+    },
+    {
+        'question': 'Hi',
+        'answer': 'Hello! How may I help you today?'
+    },
+    {
+        'question': '1',
+        'answer': 'You can upload a JSON file with FAQ data to help me better answer your questions. The file should contain a list of question-answer pairs.'
+    },
+    {
+        'question': 'help',
+        'answer': 'You can upload a JSON file with FAQ data to help me better answer your questions. The file should contain a list of question-answer pairs.'
+    },
+    {
+        'question': 'How do I use this?',
+        'answer': 'To get started, you can upload a JSON file containing your FAQ data. The file should include questions and their corresponding answers.'
+    }
+]
+
+def allowed_file(filename):
+    """Check if the uploaded file has an allowed extension"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def validate_faq_data(data):
+    """Validate the structure of uploaded FAQ data"""
+    if not isinstance(data, list):
+        return False, "FAQ data must be a list"
+    
+    for item in data:
+        if not isinstance(item, dict):
+            return False, "Each FAQ item must be a dictionary"
+        
+        if 'question' not in item or 'answer' not in item:
+            return False, "Each FAQ item must contain 'question' and 'answer' keys"
+        
+        if not isinstance(item['question'], str) or not isinstance(item['answer'], str):
+            return False, "Question and answer must be strings"
+        
+        if not item['question'].strip() or not item['answer'].strip():
+            return False, "Question and answer cannot be empty"
+    
+    return True, "Data is valid"
@@ -0,0 +1,103 @@
+"""
+Load test the /chat endpoint of a running chatbot server.
+
+Sends the questions of an FAQ file from concurrent clients, each keeping
+one connection alive, and reports p50/p99 latency and requests per second.
+Run it against both serving modes to compare them:
+
+    python app.py                                 # Flask, port 5000
+    uvicorn asgi:app --port 8000                  # ASGI with process pool
+    python loadtest.py --url http://127.0.0.1:5000
+    python loadtest.py --url http://127.0.0.1:8000
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def run_client(url, messages, count, latencies, errors, lock):
+    """
+    Send count chat requests over one keep-alive connection.
+
+    :param url: Base URL of the server
+    :param messages: Messages to cycle through
+    :param count: Number of requests to send
+    :param latencies: Shared list collecting latencies in seconds
+    :param errors: Shared list collecting error descriptions
+    :param lock: Lock guarding the shared lists
+    """
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+
+    for i in range(count):
+        body = json.dumps({'message': messages[i % len(messages)]})
+        start = time.perf_counter()
+        try:
+            connection.request('POST', parts.path.rstrip('/') + '/chat', body, headers)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(f"HTTP {response.status}")
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            with lock:
+                errors.append(str(e))
+
+    connection.close()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the server')
+    parser.add_argument('--faqs', default='faqs.json', help='FAQ file providing the messages')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=2000, help='Total number of requests')
+    args = parser.parse_args()
+
+    with open(args.faqs, encoding='utf-8') as f:
+        messages = [faq['question'] for faq in json.load(f)]
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_client = max(1, args.requests // args.clients)
+
+    clients = [
+        threading.Thread(target=run_client, args=(args.url, messages, per_client, latencies, errors, lock))
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    duration = time.perf_counter() - start
+
+    print(f"Target:     {args.url} ({args.clients} clients)")
+    print(f"Requests:   {len(latencies)} ok, {len(errors)} failed in {duration:.2f} s")
+    if errors:
+        print(f"First error: {errors[0]}")
+    if latencies:
+        latencies.sort()
+        print(f"Throughput: {len(latencies) / duration:.1f} requests/s")
+        print(f"Latency:    p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+              f"mean {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
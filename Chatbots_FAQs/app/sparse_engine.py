@@ -0,0 +1,356 @@
+import copy
+from array import array
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:  # scipy is optional, only needed for engine='sparse'
+    sparse = None
+
+
+def feature_arrays(token_lists, vocabulary):
+    """
+    Build the sparse features of preprocessed FAQ questions as flat arrays.
+
+    This is the form index snapshots store them in: CSR index pointers,
+    column indices (sorted within each row) and values of the token incidence
+    and token character matrices, plus the length of every vocabulary token.
+
+    :param token_lists: List of preprocessed token lists, one per FAQ
+    :param vocabulary: Mapping of every token to its column
+    :return: Tuple of (alphabet list, dictionary of array.array by name)
+    """
+    incidence_indptr = array('i', [0])
+    incidence_indices = array('i')
+    for tokens in token_lists:
+        incidence_indices.extend(sorted({vocabulary[token] for token in tokens}))
+        incidence_indptr.append(len(incidence_indices))
+
+    tokens_by_column = sorted(vocabulary, key=vocabulary.get)
+    alphabet = {}
+    char_indptr = array('i', [0])
+    char_indices = array('i')
+    for token in tokens_by_column:
+        char_indices.extend(sorted({alphabet.setdefault(char, len(alphabet)) for char in token}))
+        char_indptr.append(len(char_indices))
+
+    arrays = {
+        'incidence_indptr': incidence_indptr,
+        'incidence_indices': incidence_indices,
+        'incidence_data': array('d', [1.0]) * len(incidence_indices),
+        'char_indptr': char_indptr,
+        'char_indices': char_indices,
+        'char_data': array('d', [1.0]) * len(char_indices),
+        'token_lengths': array('d', (len(token) for token in tokens_by_column)),
+    }
+    return list(alphabet), arrays
+
+
+class SparseScoringEngine:
+    # Rows changed since the engine was built are scored by a small separate
+    # engine; needs_rebuild asks for a full rebuild beyond this many of them
+    MAX_DELTA_ROWS = 256
+
+    def __init__(self, token_lists, jaccard_weight=0.6, partial_weight=0.4, chunk_size=256,
+                 memory_budget=64 * 1024 * 1024):
+        """
+        Precompute sparse features for a list of preprocessed FAQ questions.
+
+        Scores match FAQChatbot.calculate_similarity within float tolerance.
+
+        :param token_lists: List of preprocessed token lists, one per FAQ
+        :param jaccard_weight: Weight of the Jaccard similarity term
+        :param partial_weight: Weight of the partial match term
+        :param chunk_size: Maximum number of queries scored together
+        :param memory_budget: Bytes of dense working arrays a chunk may use
+        """
+        vocabulary = {}
+        for tokens in token_lists:
+            for token in sorted(set(tokens)):
+                vocabulary.setdefault(token, len(vocabulary))
+
+        alphabet, arrays = feature_arrays(token_lists, vocabulary)
+        self._setup(list(vocabulary), alphabet, arrays, jaccard_weight, partial_weight, chunk_size, memory_budget)
+
+    @classmethod
+    def from_arrays(cls, vocabulary, alphabet, arrays, jaccard_weight=0.6, partial_weight=0.4, chunk_size=256,
+                    memory_budget=64 * 1024 * 1024):
+        """
+        Create an engine over features built by feature_arrays, without copying them.
+
+        Buffers backed by a memory-mapped snapshot stay shared between processes.
+
+        :param vocabulary: List of tokens, in column order
+        :param alphabet: List of characters, in column order
+        :param arrays: Mapping of array name to a buffer of the feature_arrays layout
+        :return: SparseScoringEngine
+        """
+        engine = cls.__new__(cls)
+        engine._setup(vocabulary, alphabet, arrays, jaccard_weight, partial_weight, chunk_size, memory_budget)
+        return engine
+
+    def _setup(self, vocabulary, alphabet, arrays, jaccard_weight, partial_weight, chunk_size, memory_budget):
+        if sparse is None:
+            raise ImportError("The sparse scoring engine requires scipy")
+
+        self.jaccard_weight = jaccard_weight
+        self.partial_weight = partial_weight
+        self.chunk_size = chunk_size
+        self.memory_budget = memory_budget
+        self.vocabulary = {token: column for column, token in enumerate(vocabulary)}
+        self.alphabet = {char: column for column, char in enumerate(alphabet)}
+
+        def view(name, dtype):
+            # np.asarray keeps read-only and memory-mapped buffers as they are
+            return np.asarray(arrays[name]).view(dtype)
+
+        # Token incidence matrix: one row per FAQ, one column per vocabulary token
+        incidence_indptr = view('incidence_indptr', np.int32)
+        self.incidence = sparse.csr_matrix(
+            (view('incidence_data', np.float64), view('incidence_indices', np.int32), incidence_indptr),
+            shape=(len(incidence_indptr) - 1, len(vocabulary)),
+            copy=False
+        )
+        self.faq_sizes = np.diff(self.incidence.indptr).astype(np.float64)
+        self._nonempty_rows = np.flatnonzero(self.faq_sizes)
+        self._row_starts = self.incidence.indptr[:-1][self._nonempty_rows]
+
+        # Character-set matrix: one row per vocabulary token, one column per character
+        self.char_matrix = sparse.csr_matrix(
+            (view('char_data', np.float64), view('char_indices', np.int32), view('char_indptr', np.int32)),
+            shape=(len(vocabulary), len(alphabet)),
+            copy=False
+        )
+        self.token_lengths = view('token_lengths', np.float64)
+
+        # Changes since the build: token lists of changed rows, and the row of every FAQ
+        self._delta_tokens = ()
+        self._delta = None
+        self._rows = None
+        self._size_chunks()
+
+    def _size_chunks(self):
+        # Chunk sizes derived from the budget, so no dense array grows with the batch.
+        # Half of it goes to the (queries x FAQs) arrays of a chunk, half to a block of query tokens.
+        itemsize = np.dtype(np.float64).itemsize
+        num_faqs, num_tokens = self.incidence.shape
+        half_budget = self.memory_budget // 2
+        # Four (queries x FAQs) arrays at most: jaccard, partial sum, the block's product to add,
+        # and the previous chunk's scores still held by the caller
+        row_bytes = 4 * itemsize * num_faqs
+        if self._rows is not None:
+            # Plus the delta engine's, and the joined scores gathered into FAQ order
+            row_bytes += itemsize * (4 * len(self._delta_tokens) + len(self._rows))
+        self.query_chunk = max(1, min(self.chunk_size, half_budget // max(1, row_bytes)))
+        # Per query token: shared characters over the vocabulary as a sparse product and dense,
+        # its gather over the incidence nonzeros, their maximum per FAQ and the best overlap
+        token_row_bytes = itemsize * (3 * num_tokens + self.incidence.nnz + 2 * num_faqs)
+        self.token_block = max(1, half_budget // max(1, token_row_bytes))
+
+    @property
+    def num_rows(self):
+        """Number of FAQs scored, the length of every score row."""
+        return self.incidence.shape[0] if self._rows is None else len(self._rows)
+
+    def _changed(self, rows, delta_tokens=None):
+        """
+        Create an engine sharing the built matrices, with new FAQ rows.
+
+        :param rows: Array of the engine row of every FAQ, in FAQ order
+        :param delta_tokens: Token lists of the changed rows, or None to keep them
+        :return: SparseScoringEngine
+        """
+        engine = copy.copy(self)
+        if delta_tokens is not None:
+            engine._delta_tokens = delta_tokens
+            engine._delta = SparseScoringEngine(
+                list(delta_tokens), self.jaccard_weight, self.partial_weight, self.chunk_size, self.memory_budget
+            )
+        engine._rows = rows
+        engine._size_chunks()
+        return engine
+
+    def _current_rows(self):
+        return np.arange(self.incidence.shape[0]) if self._rows is None else self._rows
+
+    def with_appended(self, tokens):
+        """
+        Create an engine with one more FAQ after the others, scored by the delta engine.
+
+        The built matrices are shared, so the cost does not grow with the FAQ count.
+
+        :param tokens: Preprocessed token list of the new FAQ
+        :return: SparseScoringEngine
+        """
+        delta_tokens = self._delta_tokens + (tokens,)
+        row = self.incidence.shape[0] + len(delta_tokens) - 1
+        return self._changed(np.append(self._current_rows(), row), delta_tokens)
+
+    def with_replaced(self, position, tokens):
+        """
+        Create an engine with the FAQ at a position replaced; its old row is left unused.
+
+        :param position: Position of the FAQ
+        :param tokens: Preprocessed token list of the replacing FAQ
+        :return: SparseScoringEngine
+        """
+        delta_tokens = self._delta_tokens + (tokens,)
+        rows = self._current_rows().copy()
+        rows[position] = self.incidence.shape[0] + len(delta_tokens) - 1
+        return self._changed(rows, delta_tokens)
+
+    def with_deleted(self, position):
+        """
+        Create an engine without the FAQ at a position; its row is left unused.
+
+        :param position: Position of the FAQ
+        :return: SparseScoringEngine
+        """
+        return self._changed(np.delete(self._current_rows(), position))
+
+    def needs_rebuild(self):
+        """
+        Whether enough rows changed that a rebuild beats scoring the delta and unused rows.
+
+        :return: bool
+        """
+        if self._rows is None:
+            return False
+        unused = self.incidence.shape[0] + len(self._delta_tokens) - len(self._rows)
+        return len(self._delta_tokens) > self.MAX_DELTA_ROWS or unused > max(self.MAX_DELTA_ROWS, len(self._rows) // 4)
+
+    def score_batch(self, queries):
+        """
+        Score preprocessed queries against every FAQ.
+
+        The result holds len(queries) x number of FAQs scores; use
+        iter_score_chunks to reduce large batches chunk by chunk instead.
+
+        :param queries: List of preprocessed token lists
+        :return: Array of shape (len(queries), number of FAQs)
+        """
+        scores = np.zeros((len(queries), self.num_rows))
+        for start, chunk_scores in self.iter_score_chunks(queries):
+            scores[start:start + len(chunk_scores)] = chunk_scores
+        return scores
+
+    def iter_score_chunks(self, queries):
+        """
+        Score preprocessed queries chunk by chunk, within the memory budget.
+
+        :param queries: List of preprocessed token lists
+        :return: Iterator of (position of the first query, array of chunk scores)
+        """
+        for start in range(0, len(queries), self.query_chunk):
+            chunk = queries[start:start + self.query_chunk]
+            scores = self._score_chunk(chunk)
+            if self._rows is not None:
+                # Rows of FAQs changed since the build come from the delta engine
+                if self._delta is not None:
+                    scores = np.hstack([scores, self._delta._score_chunk(chunk)])
+                scores = scores[:, self._rows]
+            yield start, scores
+
+    def _score_chunk(self, queries):
+        """
+        Score a chunk of preprocessed queries against every FAQ.
+
+        :param queries: List of preprocessed token lists
+        :return: Array of shape (len(queries), number of FAQs)
+        """
+        query_sets = [set(tokens) for tokens in queries]
+        query_sizes = np.array([len(tokens) for tokens in query_sets], dtype=np.float64)
+
+        # Distinct tokens of the whole chunk, each scored once
+        unique_tokens = {}
+        membership_rows = []
+        membership_cols = []
+        for row, tokens in enumerate(query_sets):
+            for token in tokens:
+                membership_rows.append(row)
+                membership_cols.append(unique_tokens.setdefault(token, len(unique_tokens)))
+
+        membership = sparse.csc_matrix(
+            (np.ones(len(membership_rows)), (membership_rows, membership_cols)),
+            shape=(len(queries), len(unique_tokens))
+        )
+
+        # Jaccard similarity from shared vocabulary tokens
+        known_rows = []
+        known_cols = []
+        for token, row in unique_tokens.items():
+            column = self.vocabulary.get(token)
+            if column is not None:
+                known_rows.append(row)
+                known_cols.append(column)
+
+        token_to_vocab = sparse.csr_matrix(
+            (np.ones(len(known_rows)), (known_rows, known_cols)),
+            shape=(len(unique_tokens), len(self.vocabulary))
+        )
+        # Computed in place: the union is zero only where the intersection is
+        jaccard = (membership @ token_to_vocab @ self.incidence.T).toarray()
+        union = np.add.outer(query_sizes, self.faq_sizes)
+        union -= jaccard
+        np.divide(jaccard, union, out=jaccard, where=union > 0)
+        del union
+
+        # Partial matches: shared characters of every (query token, FAQ token) pair
+        char_rows = []
+        char_cols = []
+        query_lengths = np.zeros(len(unique_tokens))
+        for token, row in unique_tokens.items():
+            query_lengths[row] = len(token)
+            for char in set(token):
+                column = self.alphabet.get(char)
+                if column is not None:
+                    char_rows.append(row)
+                    char_cols.append(column)
+
+        query_chars = sparse.csr_matrix(
+            (np.ones(len(char_rows)), (char_rows, char_cols)),
+            shape=(len(unique_tokens), len(self.alphabet))
+        )
+
+        # Best overlap of each query token within each FAQ question, a block of tokens at a time
+        partial_sum = np.zeros((len(queries), self.incidence.shape[0]))
+        token_count = len(unique_tokens) if len(self._nonempty_rows) else 0
+        for low in range(0, token_count, self.token_block):
+            high = min(low + self.token_block, token_count)
+            overlap = (query_chars[low:high] @ self.char_matrix.T).toarray()
+            overlap /= np.maximum(query_lengths[low:high, None], self.token_lengths[None, :])
+
+            best_overlap = np.zeros((high - low, self.incidence.shape[0]))
+            best_overlap[:, self._nonempty_rows] = np.maximum.reduceat(
+                overlap[:, self.incidence.indices], self._row_starts, axis=1
+            )
+            partial_sum += membership[:, low:high] @ best_overlap
+
+        # Partial sums are zero for queries without tokens, so dividing in place leaves them zero
+        np.divide(partial_sum, query_sizes[:, None], out=partial_sum, where=query_sizes[:, None] > 0)
+
+        jaccard *= self.jaccard_weight
+        partial_sum *= self.partial_weight
+        jaccard += partial_sum
+        return jaccard
+
+    @staticmethod
+    def top_k(scores, k):
+        """
+        Select the positions of the k highest scores.
+
+        Ties resolve to the lowest position, like a stable descending sort.
+
+        :param scores: 1-D array of scores
+        :param k: Number of positions to return
+        :return: Array of positions, best score first
+        """
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        if k < len(scores):
+            kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+            positions = np.flatnonzero(scores >= kth_score)
+        else:
+            positions = np.arange(len(scores))
+        return positions[np.argsort(-scores[positions], kind='stable')][:k]